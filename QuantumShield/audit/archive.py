@@ -0,0 +1,293 @@
+# audit/archive.py
+#
+# Compacts cold audit transcripts into compressed, indexed archives.
+#
+# Sealed segments (and legacy one-file-per-event transcripts) are
+# rewritten into audit/archive/:
+#
+#   audit-<UTC>.<codec>.qsa    independently compressed blocks of
+#                              BLOCK_RECORDS JSON lines, time-sorted
+#   audit-<UTC>.<codec>.idx    sidecar index (JSON)
+#
+# The index lists every block's byte range and time span, and maps
+# each event type and session id to the blocks that contain it, so a
+# query decompresses only the blocks that can match (audit/query.py).
+#
+#   python -m audit.archive                 # gzip, sealed segments only
+#   python -m audit.archive --codec lzma --older-than 86400
+
+import argparse
+import datetime
+import gzip
+import json
+import lzma
+import os
+import time
+
+from audit.transcript_logger import TRANSCRIPT_DIR, SEGMENT_MAX_AGE, list_segments
+
+BASE_DIR = os.path.dirname(__file__)
+ARCHIVE_DIR = os.path.join(BASE_DIR, "archive")
+
+ARCHIVE_SUFFIX = ".qsa"
+INDEX_SUFFIX = ".idx"
+BLOCK_RECORDS = 1000
+ARCHIVE_RECORDS = 500_000  # records per archive file
+
+# Untouched for longer than a rotation period: no process writes it
+ARCHIVE_AFTER = SEGMENT_MAX_AGE + 60  # seconds
+
+CODECS = {
+    "gzip": (gzip.compress, gzip.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def parse_timestamp(value) -> float:
+    """
+    Epoch seconds for an audit timestamp ("2026-02-01T10:00:00.123Z")
+    or any ISO date / datetime (naive values are UTC).
+    """
+    dt = datetime.datetime.fromisoformat(str(value).rstrip("Z"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def session_of(record):
+    metadata = record.get("metadata")
+    sid = metadata.get("session_id") if isinstance(metadata, dict) else None
+    return None if sid is None else str(sid)
+
+
+def list_archives(archive_dir=ARCHIVE_DIR):
+    """
+    Index paths of complete archives, oldest first.
+    """
+    try:
+        names = os.listdir(archive_dir)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(archive_dir, n) for n in sorted(names) if n.endswith(INDEX_SUFFIX)]
+
+
+def load_index(index_path):
+    with open(index_path, "r") as f:
+        return json.load(f)
+
+
+def read_block(index_path, index, block_id):
+    """
+    Decompressed records of one block.
+    """
+    block = index["blocks"][block_id]
+    path = index_path[:-len(INDEX_SUFFIX)] + ARCHIVE_SUFFIX
+    with open(path, "rb") as f:
+        f.seek(block["offset"])
+        data = f.read(block["length"])
+    _, decompress = CODECS[index["codec"]]
+    return [json.loads(line) for line in decompress(data).splitlines()]
+
+
+# -------- collecting cold transcripts --------
+
+def _read_lines(path):
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # torn write
+
+
+def transcript_files(directory=TRANSCRIPT_DIR):
+    """
+    Segments, then legacy one-file-per-event transcripts.
+    """
+    paths = list_segments(directory)
+    try:
+        paths += [
+            os.path.join(directory, n) for n in sorted(os.listdir(directory))
+            if n.endswith(".json")
+        ]
+    except FileNotFoundError:
+        pass
+    return paths
+
+
+def cold_sources(directory=TRANSCRIPT_DIR, older_than=ARCHIVE_AFTER, now=None):
+    """
+    Transcript files last modified more than `older_than` seconds ago.
+    """
+    now = time.time() if now is None else now
+    cold = []
+    for path in transcript_files(directory):
+        try:
+            if now - os.path.getmtime(path) > older_than:
+                cold.append(path)
+        except FileNotFoundError:
+            continue
+    return cold
+
+
+def read_records(path):
+    if path.endswith(".json"):
+        try:
+            with open(path, "r") as f:
+                return [json.load(f)]
+        except Exception:
+            return []
+    return list(_read_lines(path))
+
+
+def _archived_sources(archive_dir):
+    done = set()
+    for index_path in list_archives(archive_dir):
+        try:
+            done.update(load_index(index_path).get("sources", []))
+        except Exception:
+            continue
+    return done
+
+
+# -------- writing --------
+
+def _sort_key(record):
+    try:
+        return parse_timestamp(record.get("timestamp"))
+    except Exception:
+        return 0.0
+
+
+def write_archive(records, sources, archive_dir=ARCHIVE_DIR, codec="gzip",
+                  block_records=BLOCK_RECORDS):
+    """
+    Writes `records` as one archive + index. Returns the index path,
+    or None if there was nothing to write.
+    """
+    if not records:
+        return None
+    compress, _ = CODECS[codec]
+    records = sorted(records, key=_sort_key)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S.%fZ")
+    base = os.path.join(archive_dir, f"audit-{stamp}.{codec}")
+
+    index = {
+        "version": 1,
+        "codec": codec,
+        "records": len(records),
+        "min_ts": None,
+        "max_ts": None,
+        "sources": [os.path.basename(p) for p in sources],
+        "blocks": [],
+        "event_types": {},  # event type -> [block ids]
+        "sessions": {},     # session id -> [block ids]
+    }
+
+    offset = 0
+    tmp = f"{base}{ARCHIVE_SUFFIX}.tmp"
+    with open(tmp, "wb") as out:
+        for block_id, start in enumerate(range(0, len(records), block_records)):
+            chunk = records[start:start + block_records]
+            data = compress(b"".join(
+                json.dumps(r, separators=(",", ":"), default=str).encode() + b"\n"
+                for r in chunk
+            ))
+            out.write(data)
+
+            times = [_sort_key(r) for r in chunk]
+            index["blocks"].append({
+                "offset": offset,
+                "length": len(data),
+                "count": len(chunk),
+                "min_ts": times[0],
+                "max_ts": times[-1],
+            })
+            offset += len(data)
+
+            for record in chunk:
+                for key, value in (("event_types", record.get("event_type")),
+                                   ("sessions", session_of(record))):
+                    if value is None:
+                        continue
+                    blocks = index[key].setdefault(str(value), [])
+                    if not blocks or blocks[-1] != block_id:
+                        blocks.append(block_id)
+
+        out.flush()
+        os.fsync(out.fileno())
+
+    index["min_ts"] = index["blocks"][0]["min_ts"]
+    index["max_ts"] = index["blocks"][-1]["max_ts"]
+
+    # Data first, index last: an archive without an index is invisible
+    os.replace(tmp, base + ARCHIVE_SUFFIX)
+    with open(base + INDEX_SUFFIX + ".tmp", "w") as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(base + INDEX_SUFFIX + ".tmp", base + INDEX_SUFFIX)
+    return base + INDEX_SUFFIX
+
+
+def archive(directory=TRANSCRIPT_DIR, archive_dir=ARCHIVE_DIR, codec="gzip",
+            older_than=ARCHIVE_AFTER, block_records=BLOCK_RECORDS,
+            archive_records=ARCHIVE_RECORDS):
+    """
+    Moves cold transcripts into new archives (about `archive_records`
+    records each, bounding memory) and deletes the originals.
+    Returns (index paths, number of sources archived).
+    """
+    done = _archived_sources(archive_dir)
+    written, archived = [], 0
+    sources, records = [], []
+
+    def flush():
+        index_path = write_archive(records, sources, archive_dir, codec, block_records)
+        if index_path is not None:
+            written.append(index_path)
+        for path in sources:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return len(sources)
+
+    for path in cold_sources(directory, older_than):
+        if os.path.basename(path) in done:
+            # Archived by an earlier run that stopped before deleting it
+            os.remove(path)
+            continue
+        sources.append(path)
+        records.extend(read_records(path))
+        if len(records) >= archive_records:
+            archived += flush()
+            sources, records = [], []
+
+    archived += flush()
+    return written, archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact cold audit transcripts")
+    parser.add_argument("--codec", choices=sorted(CODECS), default="gzip")
+    parser.add_argument("--older-than", type=float, default=ARCHIVE_AFTER,
+                        help="seconds since a transcript was last written")
+    parser.add_argument("--block-records", type=int, default=BLOCK_RECORDS)
+    args = parser.parse_args()
+
+    written, count = archive(
+        codec=args.codec, older_than=args.older_than, block_records=args.block_records
+    )
+    if not written:
+        print("Nothing to archive")
+    for index_path in written:
+        print(f"Wrote {index_path}")
+    if written:
+        print(f"Archived {count} transcript file(s)")
+
+
+if __name__ == "__main__":
+    main()
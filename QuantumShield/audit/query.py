@@ -0,0 +1,160 @@
+# audit/query.py
+#
+# Queries audit records across compressed archives and hot segments.
+#
+# Archive indexes (audit/archive.py) are consulted first: only blocks
+# whose time span overlaps the query and that contain a matching event
+# type / session id are decompressed. Hot segments are scanned in full
+# (they only hold the last rotation period or so).
+#
+#   python -m audit.query --session 3f9a... --event 'kem_handshake*'
+#   python -m audit.query --event '*fail*' --since 2026-02-03 --until 2026-02-04
+#   python -m audit.query --match transport=tcp --count
+
+import argparse
+import fnmatch
+import json
+import sys
+
+from audit.archive import (
+    ARCHIVE_DIR, list_archives, load_index, read_block, read_records,
+    transcript_files, parse_timestamp, session_of,
+)
+from audit.transcript_logger import TRANSCRIPT_DIR
+
+
+def _matches(record, since, until, event_types, session_id, match):
+    if event_types and not any(
+        fnmatch.fnmatchcase(str(record.get("event_type")), p) for p in event_types
+    ):
+        return False
+    if session_id is not None and session_of(record) != session_id:
+        return False
+    if match:
+        metadata = record.get("metadata")
+        if not isinstance(metadata, dict):
+            return False
+        if any(str(metadata.get(k)) != v for k, v in match.items()):
+            return False
+    if since is not None or until is not None:
+        try:
+            ts = parse_timestamp(record.get("timestamp"))
+        except Exception:
+            return False
+        if since is not None and ts < since:
+            return False
+        if until is not None and ts >= until:
+            return False
+    return True
+
+
+def _candidate_blocks(index, since, until, event_types, session_id):
+    """
+    Block ids that may hold matching records, from the index alone.
+    """
+    if since is not None and index["max_ts"] < since:
+        return []
+    if until is not None and index["min_ts"] >= until:
+        return []
+
+    blocks = set(range(len(index["blocks"])))
+    if event_types:
+        types = [t for t in index["event_types"]
+                 if any(fnmatch.fnmatchcase(t, p) for p in event_types)]
+        blocks &= {b for t in types for b in index["event_types"][t]}
+    if session_id is not None:
+        blocks &= set(index["sessions"].get(session_id, []))
+
+    return sorted(
+        b for b in blocks
+        if (since is None or index["blocks"][b]["max_ts"] >= since)
+        and (until is None or index["blocks"][b]["min_ts"] < until)
+    )
+
+
+def query(since=None, until=None, event_types=None, session_id=None, match=None,
+          archive_dir=ARCHIVE_DIR, transcript_dir=TRANSCRIPT_DIR, include_hot=True,
+          stats=None):
+    """
+    Yields matching records, archives first (oldest first), then hot
+    transcripts. `since` / `until` are epoch seconds or ISO strings
+    (until is exclusive); `event_types` are fnmatch patterns; `match`
+    maps metadata keys to required string values. `stats`, if a dict,
+    receives counts of blocks read and skipped.
+    """
+    since = parse_timestamp(since) if isinstance(since, str) else since
+    until = parse_timestamp(until) if isinstance(until, str) else until
+    stats = stats if stats is not None else {}
+    stats.update(archives=0, blocks_read=0, blocks_skipped=0, hot_files=0)
+
+    for index_path in list_archives(archive_dir):
+        try:
+            index = load_index(index_path)
+        except Exception:
+            continue
+        stats["archives"] += 1
+        blocks = _candidate_blocks(index, since, until, event_types, session_id)
+        stats["blocks_read"] += len(blocks)
+        stats["blocks_skipped"] += len(index["blocks"]) - len(blocks)
+
+        for block_id in blocks:
+            for record in read_block(index_path, index, block_id):
+                if _matches(record, since, until, event_types, session_id, match):
+                    yield record
+
+    if not include_hot:
+        return
+
+    for path in transcript_files(transcript_dir):
+        stats["hot_files"] += 1
+        try:
+            records = read_records(path)
+        except FileNotFoundError:
+            continue  # archived while we were reading
+        for record in records:
+            if _matches(record, since, until, event_types, session_id, match):
+                yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query audit transcripts and archives")
+    parser.add_argument("--since", help="ISO date/time (UTC), inclusive")
+    parser.add_argument("--until", help="ISO date/time (UTC), exclusive")
+    parser.add_argument("--event", action="append",
+                        help="event type or fnmatch pattern (repeatable)")
+    parser.add_argument("--session", help="metadata.session_id")
+    parser.add_argument("--match", action="append", default=[],
+                        help="metadata KEY=VALUE (repeatable)")
+    parser.add_argument("--no-hot", action="store_true",
+                        help="archives only, skip live transcripts")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--count", action="store_true", help="print only the number of matches")
+    args = parser.parse_args()
+
+    match = dict(m.split("=", 1) for m in args.match)
+    stats = {}
+    results = query(
+        since=args.since, until=args.until, event_types=args.event,
+        session_id=args.session, match=match, include_hot=not args.no_hot,
+        stats=stats,
+    )
+
+    count = 0
+    for record in results:
+        count += 1
+        if not args.count:
+            print(json.dumps(record, separators=(",", ":")))
+        if args.limit is not None and count >= args.limit:
+            break
+
+    if args.count:
+        print(count)
+    print(
+        f"# {count} match(es); {stats['blocks_read']} block(s) read, "
+        f"{stats['blocks_skipped']} skipped in {stats['archives']} archive(s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
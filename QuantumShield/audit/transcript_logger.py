@@ -1,22 +1,225 @@
+# audit/transcript_logger.py
+#
+# Append-only audit log.
+#
+# Events are appended as one compact JSON object per line to segment
+# files in audit/transcripts/:
+#
+#   events-<UTC start>-<pid>.jsonl
+#
+# - log_event() only builds the record and puts the line on a bounded
+#   in-memory queue; a background thread batches lines into the open
+#   segment and flushes every FLUSH_INTERVAL seconds.
+# - A segment is closed after SEGMENT_MAX_BYTES or SEGMENT_MAX_AGE
+#   seconds, whichever comes first. Each process writes its own
+#   segments, so lines are never interleaved.
+# - When the queue is full new events are dropped and counted
+#   (stats()["dropped"]) instead of blocking the caller.
+# - QS_AUDIT_FSYNC picks durability: "never", "rotate" (fsync a segment
+#   when it is closed, default) or "flush" (fsync after every batch).
+#
+# The record schema is unchanged: id, event_type, timestamp, metadata.
+
+import atexit
 import json
 import os
 import datetime
+import queue
+import threading
+import time
 import uuid
 
 # Directory where audit transcripts are stored
 BASE_DIR = os.path.dirname(__file__)
 TRANSCRIPT_DIR = os.path.join(BASE_DIR, "transcripts")
 
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".jsonl"
+
+SEGMENT_MAX_BYTES = int(os.environ.get("QS_AUDIT_SEGMENT_BYTES", 64 * 1024 * 1024))
+SEGMENT_MAX_AGE = float(os.environ.get("QS_AUDIT_SEGMENT_SECONDS", 3600))
+QUEUE_SIZE = int(os.environ.get("QS_AUDIT_QUEUE", 100_000))  # events held in memory
+FLUSH_INTERVAL = 0.2  # seconds
+BATCH_SIZE = 1000  # lines per write
+
+FSYNC_NEVER = "never"
+FSYNC_ROTATE = "rotate"
+FSYNC_FLUSH = "flush"
+FSYNC_POLICY = os.environ.get("QS_AUDIT_FSYNC", FSYNC_ROTATE)
 
-def _ensure_dir():
+
+def list_segments(directory=TRANSCRIPT_DIR):
     """
-    Ensure transcript directory exists.
-    Fail silently if it cannot be created.
+    Segment paths, oldest first.
     """
     try:
-        os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
-    except Exception:
-        pass
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    names = [n for n in names if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)]
+    return [os.path.join(directory, n) for n in sorted(names)]
+
+
+class SegmentWriter:
+    def __init__(self, directory=TRANSCRIPT_DIR, max_bytes=SEGMENT_MAX_BYTES,
+                 max_age=SEGMENT_MAX_AGE, queue_size=QUEUE_SIZE, fsync=FSYNC_POLICY):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fsync = fsync
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._size = 0
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.segments = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, line: str):
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    # -------- writer thread --------
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                line = self._queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+            self._write_batch(self._drain(line))
+
+        # Shutdown: write out whatever is still queued
+        lines = self._drain()
+        while lines:
+            self._write_batch(lines)
+            lines = self._drain()
+        self._close_segment()
+
+    def _drain(self, first=None):
+        lines = [] if first is None else [first]
+        while len(lines) < BATCH_SIZE:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def _write_batch(self, lines):
+        # flush() markers: set once the lines queued before them are out
+        markers = [x for x in lines if isinstance(x, threading.Event)]
+        if markers:
+            lines = [x for x in lines if not isinstance(x, threading.Event)]
+        try:
+            self._write_lines(lines)
+        finally:
+            for marker in markers:
+                marker.set()
+
+    def _write_lines(self, lines):
+        if not lines:
+            return
+        try:
+            self._maybe_rotate()
+            if self._file is None:
+                self._open_segment()
+            data = "".join(lines).encode()
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync == FSYNC_FLUSH:
+                os.fsync(self._file.fileno())
+            self._size += len(data)
+            self.written += len(lines)
+        except Exception:
+            # Disk full, permissions...: lose the batch, keep running
+            self.errors += len(lines)
+            self._close_segment()
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        if self._size >= self.max_bytes or time.time() - self._opened_at >= self.max_age:
+            self._close_segment()
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S.%fZ")
+        self._path = os.path.join(
+            self.directory, f"{SEGMENT_PREFIX}{stamp}-{os.getpid()}{SEGMENT_SUFFIX}"
+        )
+        self._file = open(self._path, "ab")
+        self._opened_at = time.time()
+        self._size = 0
+        self.segments += 1
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+            if self.fsync != FSYNC_NEVER:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        except Exception:
+            pass
+        self._file = None
+
+    # -------- control --------
+
+    def flush(self, timeout=5.0):
+        """
+        Waits until everything queued so far has been written.
+        Returns False on timeout.
+        """
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.wait(timeout)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "segment": self._path,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "segments": self.segments,
+            "fsync": self.fsync,
+        }
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer():
+    # One writer per process; a forked child starts its own
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                _writer = SegmentWriter()
+                _writer_pid = os.getpid()
+                atexit.register(_writer.close)
+    return _writer
 
 
 def log_event(event_type, metadata):
@@ -30,8 +233,6 @@ def log_event(event_type, metadata):
     This function MUST NOT raise exceptions.
     """
     try:
-        _ensure_dir()
-
         record = {
             "id": str(uuid.uuid4()),
             "event_type": event_type,
@@ -39,12 +240,12 @@ def log_event(event_type, metadata):
             "metadata": metadata
         }
 
-        filename = f"{record['timestamp']}_{event_type}.json"
-        path = os.path.join(TRANSCRIPT_DIR, filename)
-
-        with open(path, "w") as f:
-            json.dump(record, f, indent=2)
+        _get_writer().submit(json.dumps(record, separators=(",", ":"), default=str) + "\n")
 
     except Exception:
         # Fail-open: auditing must never affect core logic
         pass
+
+
+def stats():
+    return _get_writer().stats()
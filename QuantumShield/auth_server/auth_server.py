@@ -1,7 +1,18 @@
+import os
+
 from flask import Flask, request, jsonify
 
-from auth_server.kemtls_server import KEMTLSServer
-from auth_server.token_service import TokenService
+from auth_server.kemtls_server import KEMTLSServer, StaleServerKey, KEY_MAX_AGE
+from auth_server.token_service import TokenService, FORMAT_JWT, FORMAT_CWT
+from auth_server.cwt import MEDIA_TYPE as CWT_MEDIA_TYPE
+from auth_server.token_verifier import verify_token, InvalidToken
+from auth_server.token_cache import VerifiedTokenCache
+from auth_server.jwks import get_jwks
+from auth_server.keystore import session_db_path, session_master_key, session_seal_keys
+from auth_server.crypto_pool import attach_worker_pool
+from crypto.sqlite_session_store import SQLiteSessionStore
+from crypto.stateless_session import SESSION_STATELESS
+from crypto.tickets import InvalidTicket, KeyRing
 
 # Optional dashboard updater (FAIL-OPEN)
 try:
@@ -20,8 +31,43 @@ except Exception:
 
 app = Flask(__name__)
 
-kemtls = KEMTLSServer()
+# Session backend: QS_SESSION_BACKEND=sqlite shares sessions between
+# worker processes (e.g. gunicorn -w N) through QS_SESSION_DB;
+# QS_SESSION_BACKEND=stateless seals them into the session id under
+# QS_SESSION_SEAL_KEYS, so any node behind a load balancer serves them.
+SESSION_BACKEND = os.environ.get("QS_SESSION_BACKEND", "memory")
+if SESSION_BACKEND == SESSION_STATELESS:
+    kemtls = KEMTLSServer(
+        session_mode=SESSION_STATELESS,
+        seal_keys=KeyRing(session_seal_keys()),
+    )
+elif SESSION_BACKEND == "sqlite":
+    kemtls = KEMTLSServer(sessions=SQLiteSessionStore(
+        session_master_key(),
+        path=os.environ.get("QS_SESSION_DB") or session_db_path(),
+    ))
+else:
+    kemtls = KEMTLSServer()
 tokens = TokenService()
+token_cache = VerifiedTokenCache()
+
+# Keys come from the on-disk keystore (QS_KEYSTORE_DIR); new ones are
+# generated in the background before the current ones retire.
+kemtls.keys.start_rotation()
+tokens.keys.start_rotation()
+
+# Multi-core crypto: QS_CRYPTO_WORKERS=<n> moves decap + token signing
+# onto n worker processes sharing this server's keys (0 = inline).
+CRYPTO_WORKERS = int(os.environ.get("QS_CRYPTO_WORKERS", "0"))
+if CRYPTO_WORKERS > 0:
+    attach_worker_pool(kemtls, tokens, workers=CRYPTO_WORKERS)
+
+# Merkle batch signing for /token: QS_TOKEN_BATCH_MS=<window> turns it
+# on (0 = one signature per token), QS_TOKEN_BATCH_MAX caps batch size.
+TOKEN_BATCH_MS = float(os.environ.get("QS_TOKEN_BATCH_MS", "0"))
+TOKEN_BATCH_MAX = int(os.environ.get("QS_TOKEN_BATCH_MAX", "256"))
+if TOKEN_BATCH_MS > 0:
+    tokens.enable_batching(window_ms=TOKEN_BATCH_MS, max_batch=TOKEN_BATCH_MAX)
 
 # -------------------------------------------------
 # INITIAL RUNTIME STATE (Dashboard Baseline)
@@ -44,8 +90,11 @@ except Exception:
 @app.route("/kemtls/server-pk", methods=["GET"])
 def kemtls_server_pk():
     try:
+        server_pk, key_id = kemtls.server_key()
         return jsonify({
-            "server_pk": kemtls.get_server_pk().hex()
+            "server_pk": server_pk.hex(),
+            "key_id": key_id,
+            "max_age": KEY_MAX_AGE
         })
     except Exception as e:
         log_failure(
@@ -59,26 +108,57 @@ def kemtls_server_pk():
 def kemtls_handshake():
     try:
         ciphertext = bytes.fromhex(request.json["ciphertext"])
-        sid = kemtls.complete_handshake(ciphertext)
+        sid, ticket = kemtls.complete_handshake_resumable(
+            ciphertext, request.json.get("key_id")
+        )
 
         # Dashboard update: handshake successful
         update_state(
             status="handshake_complete"
         )
 
-        return jsonify({"session_id": sid})
+        return jsonify({
+            "session_id": sid,
+            "ticket": ticket.hex(),
+            "ticket_lifetime": kemtls.tickets.lifetime,
+            "session_mode": kemtls.session_mode
+        })
+
+    except StaleServerKey:
+        # Client used a cached key this server no longer holds: refetch
+        return jsonify({"error": "stale_key", "key_id": kemtls.key_id}), 409
 
     except Exception as e:
         log_failure(
             "KEMTLS handshake failed",
             {"error": str(e)}
         )
-        update_state(
-            status="crypto_failure",
-            last_failure="KEMTLS handshake failed"
+        raise
+
+@app.route("/kemtls/resume", methods=["POST"])
+def kemtls_resume():
+    try:
+        ticket = bytes.fromhex(request.json["ticket"])
+        nonce = bytes.fromhex(request.json["nonce"])
+        sid = kemtls.resume(ticket, nonce)
+
+        return jsonify({"session_id": sid, "session_mode": kemtls.session_mode})
+
+    except InvalidTicket as e:
+        # Not a crypto failure: client falls back to a full handshake
+        return jsonify({"error": "invalid_ticket", "reason": str(e)}), 401
+
+    except Exception as e:
+        log_failure(
+            "KEMTLS resumption failed",
+            {"error": str(e)}
         )
         raise
 
+@app.route("/kemtls/sessions/stats", methods=["GET"])
+def kemtls_session_stats():
+    return jsonify(kemtls.sessions.stats())
+
 # -------------------------------
 # OIDC-LIKE FLOW
 # -------------------------------
@@ -95,10 +175,6 @@ def authorize():
             "Authorization step failed",
             {"error": str(e)}
         )
-        update_state(
-            status="crypto_failure",
-            last_failure="Authorization encryption failed"
-        )
         raise
 
 
@@ -107,22 +183,55 @@ def token():
     try:
         sid = request.headers["X-Session-ID"]
 
-        jwt = tokens.create_id_token("user", "client")
-        encrypted = kemtls.encrypt(sid, jwt.encode())
+        # Clients opt into the compact CBOR token with Accept: application/cwt
+        fmt = FORMAT_CWT if CWT_MEDIA_TYPE in request.headers.get("Accept", "") else FORMAT_JWT
 
-        return jsonify({"data": encrypted})
+        token_bytes = tokens.issue("user", "client", fmt)
+        encrypted = kemtls.encrypt(sid, token_bytes)
+
+        return jsonify({"data": encrypted, "format": fmt})
 
     except Exception as e:
         log_failure(
             "Token issuance failed",
             {"error": str(e)}
         )
-        update_state(
-            status="crypto_failure",
-            last_failure="Token issuance failed"
-        )
         raise
 
 
+# -------------------------------
+# TOKEN VERIFICATION (relying parties)
+# -------------------------------
+
+@app.route("/jwks", methods=["GET"])
+def jwks():
+    return jsonify(get_jwks())
+
+
+@app.route("/introspect", methods=["POST"])
+def introspect():
+    """
+    RFC 7662-style introspection. `token` is a JWT or a base64url CWT,
+    sent as JSON or form data. Verified tokens are cached until exp.
+    """
+    body = request.get_json(silent=True) or request.form
+    token = body.get("token") if isinstance(body, dict) else None
+    if not isinstance(token, str) or not token:
+        # Wrong shape (list body, numeric token...): not an active token
+        return jsonify({"active": False})
+
+    try:
+        claims = token_cache.verify(token, lambda t: verify_token(t, tokens.keys.public_key))
+    except InvalidToken:
+        return jsonify({"active": False})
+
+    return jsonify({"active": True, **claims})
+
+
+@app.route("/introspect/stats", methods=["GET"])
+def introspect_stats():
+    return jsonify(token_cache.stats())
+
+
 if __name__ == "__main__":
     app.run(port=8000)
@@ -0,0 +1,237 @@
+# auth_server/batch_signer.py
+#
+# Merkle-tree batch signing for ID tokens.
+#
+# Messages that arrive within a short window become the leaves of a
+# Merkle tree; the root is signed ONCE and every message gets back
+#
+#   u32 leaf index || u32 tree size || u8 n || n * 32-byte siblings
+#   || signature over (BATCH_CONTEXT || root)
+#
+# so one Dilithium signature covers up to `max_batch` tokens. Leaves
+# and inner nodes are domain-separated (RFC 6962 style) and an odd
+# node at the end of a level is promoted unchanged, so a proof cannot
+# be replayed against a different tree shape.
+
+import hashlib
+import struct
+import threading
+import time
+
+BATCH_WINDOW_MS = 5
+MAX_BATCH = 256
+
+BATCH_CONTEXT = b"qs-token-batch-v1"
+ALG_PREFIX = "MTB-"  # JWT alg for batch-signed tokens, e.g. MTB-Dilithium3
+
+HASH_SIZE = 32
+_HEADER = struct.Struct(">IIB")
+
+
+class BatchSignatureError(Exception):
+    pass
+
+
+def batch_alg(base_alg):
+    return ALG_PREFIX + base_alg
+
+
+def base_alg(alg):
+    """
+    Signature algorithm behind a batch alg, or None if `alg` is not one.
+    """
+    return alg[len(ALG_PREFIX):] if alg.startswith(ALG_PREFIX) else None
+
+
+# -------- Merkle tree --------
+
+def leaf_hash(message: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + message).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def build_tree(messages):
+    """
+    Returns (root, proofs) where proofs[i] lists the sibling hashes
+    from leaf i up to the root.
+    """
+    level = [leaf_hash(m) for m in messages]
+    positions = list(range(len(level)))  # leaf -> index in current level
+    proofs = [[] for _ in level]
+
+    while len(level) > 1:
+        for leaf, pos in enumerate(positions):
+            sibling = pos ^ 1
+            if sibling < len(level):
+                proofs[leaf].append(level[sibling])
+            positions[leaf] = pos // 2
+
+        nxt = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+
+    return level[0], proofs
+
+
+def root_from_proof(message: bytes, index: int, size: int, siblings):
+    if not 0 <= index < size:
+        raise BatchSignatureError("leaf index out of range")
+
+    node = leaf_hash(message)
+    siblings = iter(siblings)
+    while size > 1:
+        if index % 2:
+            node = node_hash(next(siblings), node)
+        elif index + 1 < size:
+            node = node_hash(node, next(siblings))
+        index //= 2
+        size = (size + 1) // 2
+
+    if next(siblings, None) is not None:
+        raise BatchSignatureError("proof too long")
+    return node
+
+
+# -------- encoding --------
+
+def encode_batch_signature(index, size, siblings, root_signature: bytes) -> bytes:
+    return _HEADER.pack(index, size, len(siblings)) + b"".join(siblings) + root_signature
+
+
+def decode_batch_signature(blob: bytes):
+    """
+    Returns (index, size, siblings, root_signature).
+    """
+    if len(blob) < _HEADER.size:
+        raise BatchSignatureError("truncated batch signature")
+    index, size, count = _HEADER.unpack_from(blob)
+    end = _HEADER.size + count * HASH_SIZE
+    if len(blob) <= end:
+        raise BatchSignatureError("truncated batch signature")
+
+    siblings = [blob[i:i + HASH_SIZE] for i in range(_HEADER.size, end, HASH_SIZE)]
+    return index, size, siblings, blob[end:]
+
+
+def verify_batch_signature(message: bytes, blob: bytes, verify_root) -> bool:
+    """
+    `verify_root(signed_bytes, signature)` checks the root signature,
+    e.g. a bound liboqs Signature.verify with the issuer's key.
+    """
+    try:
+        index, size, siblings, root_signature = decode_batch_signature(blob)
+        root = root_from_proof(message, index, size, siblings)
+    except (BatchSignatureError, StopIteration):
+        return False
+    return bool(verify_root(BATCH_CONTEXT + root, root_signature))
+
+
+# -------- signer --------
+
+class _Pending:
+    __slots__ = ("message", "enqueued", "done", "result", "error")
+
+    def __init__(self, message):
+        self.message = message
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchSigner:
+    """
+    Collects sign() calls from many request threads and signs them
+    as one Merkle batch. A batch closes `window_ms` after its first
+    message or as soon as it holds `max_batch` messages; while a root
+    is being signed, new requests queue up for the next batch.
+    """
+
+    def __init__(self, sign, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        self._sign = sign
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.batches = 0
+        self.signed = 0
+        self.largest_batch = 0
+
+        self._thread = threading.Thread(target=self._run, name="token-batch-signer", daemon=True)
+        self._thread.start()
+
+    def sign(self, message: bytes) -> bytes:
+        item = _Pending(message)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("batch signer is closed")
+            self._pending.append(item)
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+
+                deadline = self._pending[0].enqueued + self.window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            root, proofs = build_tree([item.message for item in batch])
+            root_signature = self._sign(BATCH_CONTEXT + root)
+        except Exception as e:
+            for item in batch:
+                item.error = e
+                item.done.set()
+            return
+
+        size = len(batch)
+        for index, item in enumerate(batch):
+            item.result = encode_batch_signature(index, size, proofs[index], root_signature)
+            item.done.set()
+
+        self.batches += 1
+        self.signed += size
+        self.largest_batch = max(self.largest_batch, size)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "signed": self.signed,
+            "mean_batch": round(self.signed / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
@@ -0,0 +1,172 @@
+# auth_server/cbor.py
+#
+# Minimal CBOR (RFC 8949) codec for compact tokens.
+#
+# Covers what CWT / COSE_Sign1 need: unsigned and negative integers,
+# byte and text strings, arrays, maps, tags, booleans and null.
+# Encoding is deterministic (shortest integer heads, map keys sorted
+# by their encoded bytes), so the same claims always sign the same.
+
+import struct
+
+MAJOR_UINT = 0
+MAJOR_NINT = 1
+MAJOR_BYTES = 2
+MAJOR_TEXT = 3
+MAJOR_ARRAY = 4
+MAJOR_MAP = 5
+MAJOR_TAG = 6
+MAJOR_SIMPLE = 7
+
+MAX_DEPTH = 16
+
+
+class CBORError(Exception):
+    pass
+
+
+class Tag:
+    __slots__ = ("tag", "value")
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Tag) and (self.tag, self.value) == (other.tag, other.value)
+
+    def __repr__(self):
+        return f"Tag({self.tag}, {self.value!r})"
+
+
+# -------- encoding --------
+
+def _head(major, n):
+    if n < 24:
+        return bytes([major << 5 | n])
+    if n < 0x100:
+        return bytes([major << 5 | 24, n])
+    if n < 0x10000:
+        return bytes([major << 5 | 25]) + struct.pack(">H", n)
+    if n < 0x100000000:
+        return bytes([major << 5 | 26]) + struct.pack(">I", n)
+    if n < 0x10000000000000000:
+        return bytes([major << 5 | 27]) + struct.pack(">Q", n)
+    raise CBORError("integer too large")
+
+
+def _encode(value, out):
+    if value is False:
+        out.append(0xf4)
+    elif value is True:
+        out.append(0xf5)
+    elif value is None:
+        out.append(0xf6)
+    elif isinstance(value, int):
+        if value >= 0:
+            out += _head(MAJOR_UINT, value)
+        else:
+            out += _head(MAJOR_NINT, -1 - value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        value = bytes(value)
+        out += _head(MAJOR_BYTES, len(value))
+        out += value
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out += _head(MAJOR_TEXT, len(data))
+        out += data
+    elif isinstance(value, (list, tuple)):
+        out += _head(MAJOR_ARRAY, len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        items = sorted((dumps(k), v) for k, v in value.items())
+        out += _head(MAJOR_MAP, len(items))
+        for key, item in items:
+            out += key
+            _encode(item, out)
+    elif isinstance(value, Tag):
+        out += _head(MAJOR_TAG, value.tag)
+        _encode(value.value, out)
+    else:
+        raise CBORError(f"cannot encode {type(value).__name__}")
+
+
+def dumps(value) -> bytes:
+    out = bytearray()
+    _encode(value, out)
+    return bytes(out)
+
+
+# -------- decoding --------
+
+def _read_head(data, pos):
+    if pos >= len(data):
+        raise CBORError("truncated input")
+    initial = data[pos]
+    major, info = initial >> 5, initial & 0x1f
+    pos += 1
+
+    if info < 24:
+        return major, info, pos
+    sizes = {24: 1, 25: 2, 26: 4, 27: 8}
+    if info not in sizes:
+        raise CBORError("indefinite lengths and reserved values are not supported")
+    size = sizes[info]
+    if pos + size > len(data):
+        raise CBORError("truncated input")
+    return major, int.from_bytes(data[pos:pos + size], "big"), pos + size
+
+
+def _decode(data, pos, depth):
+    if depth > MAX_DEPTH:
+        raise CBORError("nesting too deep")
+
+    major, n, pos = _read_head(data, pos)
+
+    if major == MAJOR_UINT:
+        return n, pos
+    if major == MAJOR_NINT:
+        return -1 - n, pos
+    if major in (MAJOR_BYTES, MAJOR_TEXT):
+        end = pos + n
+        if end > len(data):
+            raise CBORError("truncated input")
+        chunk = bytes(data[pos:end])
+        if major == MAJOR_TEXT:
+            try:
+                return chunk.decode("utf-8"), end
+            except UnicodeDecodeError:
+                raise CBORError("invalid UTF-8 in text string")
+        return chunk, end
+    if major == MAJOR_ARRAY:
+        items = []
+        for _ in range(n):
+            item, pos = _decode(data, pos, depth + 1)
+            items.append(item)
+        return items, pos
+    if major == MAJOR_MAP:
+        result = {}
+        for _ in range(n):
+            key, pos = _decode(data, pos, depth + 1)
+            if isinstance(key, (list, dict, Tag)):
+                raise CBORError("unsupported map key type")
+            value, pos = _decode(data, pos, depth + 1)
+            result[key] = value
+        return result, pos
+    if major == MAJOR_TAG:
+        value, pos = _decode(data, pos, depth + 1)
+        return Tag(n, value), pos
+
+    # major 7: only false / true / null
+    simple = {20: False, 21: True, 22: None}
+    if n not in simple:
+        raise CBORError("unsupported simple value")
+    return simple[n], pos
+
+
+def loads(data: bytes):
+    value, pos = _decode(data, 0, 0)
+    if pos != len(data):
+        raise CBORError("trailing bytes after CBOR item")
+    return value
@@ -0,0 +1,118 @@
+# auth_server/crypto_pool.py
+#
+# Crypto backends for the auth server.
+#
+# LocalCryptoBackend runs decap / sign inline on the calling thread
+# (the original behaviour). ProcessCryptoBackend spreads them over a
+# pool of worker processes, each holding its own copy of the server's
+# long-term secret keys, so one auth server process can use every core
+# with a single set of keys.
+#
+# Both expose the same calls, taking a keystore key (ManagedKey):
+#   decap(key, ciphertext) -> shared_secret
+#   sign(key, message)     -> signature
+#   decap_many(key, [...]) / sign_many(key, [...]) -> results in input order
+#
+# Worker processes open the same keystore directory and load keys by
+# kid on first use, so key rotation needs no pool restart.
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from auth_server import keystore
+from auth_server.keystore import kem_keys, signing_keys
+
+
+class LocalCryptoBackend:
+    def decap(self, key, ciphertext: bytes) -> bytes:
+        return key.decap(ciphertext)
+
+    def sign(self, key, message: bytes) -> bytes:
+        return key.sign(message)
+
+    def decap_many(self, key, ciphertexts):
+        return [key.decap(ct) for ct in ciphertexts]
+
+    def sign_many(self, key, messages):
+        return [key.sign(m) for m in messages]
+
+    def close(self):
+        pass
+
+
+# ---- Worker-process side ----
+
+_worker_root = None
+
+
+def _init_worker(keystore_root):
+    global _worker_root
+    _worker_root = keystore_root
+    # Workers are forked (lazily, from a request thread) while the
+    # rotation threads run: any keystore lock held at that moment stays
+    # held forever in the child. Start from empty stores instead of
+    # the parent's, and reread the keys from disk.
+    keystore._stores = {}
+    keystore._stores_lock = threading.Lock()
+
+
+def _worker_key(store, kid):
+    # kids come from the parent process: always allowed to rescan
+    key = store.get(kid, refresh=True)
+    if key is None:
+        raise KeyError(f"unknown or expired key {kid}")
+    return key
+
+
+def _decap(kid, ciphertext):
+    return _worker_key(kem_keys(_worker_root), kid).decap(ciphertext)
+
+
+def _sign(kid, message):
+    return _worker_key(signing_keys(_worker_root), kid).sign(message)
+
+
+class ProcessCryptoBackend:
+    def __init__(self, keystore_root, workers=None):
+        """
+        keystore_root: directory of the server's keystore. Each worker
+        reads the secret keys it needs from there, once per key.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(keystore_root,),
+        )
+
+    def decap(self, key, ciphertext: bytes) -> bytes:
+        return self._pool.submit(_decap, key.kid, ciphertext).result()
+
+    def sign(self, key, message: bytes) -> bytes:
+        return self._pool.submit(_sign, key.kid, message).result()
+
+    def decap_many(self, key, ciphertexts):
+        # Executor.map yields results in submission order
+        return list(self._pool.map(_decap, [key.kid] * len(ciphertexts), ciphertexts))
+
+    def sign_many(self, key, messages):
+        return list(self._pool.map(_sign, [key.kid] * len(messages), messages))
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def attach_worker_pool(kemtls, tokens, workers=None):
+    """
+    Moves an existing KEMTLSServer + TokenService onto a process pool
+    that shares their keystore. Returns the backend.
+    """
+    # Make sure both current keys exist on disk before workers look for them
+    kemtls.keys.current()
+    tokens.keys.current()
+
+    backend = ProcessCryptoBackend(kemtls.keys.root, workers=workers)
+    kemtls.backend = backend
+    tokens.signer = backend
+    return backend
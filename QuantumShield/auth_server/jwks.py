@@ -1,23 +1,41 @@
 # auth_server/jwks.py
+#
+# Token signing keys, backed by the on-disk keystore
+# (auth_server/keystore.py). Nothing is generated at import time.
 
-from oqs import Signature
+import base64
 
-_SIG_ALG = "Dilithium3"
+from auth_server.keystore import signing_keys
 
-# Create signature object once
-_sig = Signature(_SIG_ALG)
-
-# Generate keypair
-sig_pk = _sig.generate_keypair()
-# Secret key is kept internally inside `_sig`
 
 def get_signing_keypair():
     """
     Returns:
-      - public key (bytes)
-      - Signature object holding the secret key
+      - public key (bytes) of the current signing key
+      - the current ManagedKey (has .kid and .sign())
     """
-    return sig_pk, _sig
+    key = signing_keys().current()
+    return key.public_key, key
+
 
 def get_server_sig_pk():
-    return sig_pk
+    return signing_keys().current().public_key
+
+
+def get_jwks():
+    """
+    JWKS-style document for relying parties: every key that may still
+    have signed a live token, newest first. PQC keys use the "AKP"
+    (algorithm key pair) key type with the raw public key
+    base64url-encoded in "pub".
+    """
+    return {
+        "keys": [{
+            "kty": "AKP",
+            "kid": key.kid,
+            "use": "sig",
+            "alg": key.alg,
+            "pub": base64.urlsafe_b64encode(key.public_key).rstrip(b"=").decode(),
+            "exp": int(key.expires),
+        } for key in signing_keys().valid_keys()]
+    }
@@ -1,26 +1,106 @@
 # auth_server/kemtls_server.py
 
-from oqs import KeyEncapsulation
+from auth_server.keystore import kem_keys
 from crypto.symmetric import SymmetricChannel
+from crypto.session_store import SessionStore
+from crypto.stateless_session import StatelessSessions, SESSION_STORED, SESSION_STATELESS
+from crypto.tickets import (
+    TicketSealer, derive_resumption_secret, derive_resumed_key,
+)
 import os
 
+# How long clients may cache the server KEM key (seconds)
+KEY_MAX_AGE = 3600
+
+
+class StaleServerKey(Exception):
+    pass
+
+
 class KEMTLSServer:
-    def __init__(self):
-        self.kem = KeyEncapsulation("Kyber768")
-        self.server_pk = self.kem.generate_keypair()
-        self.sessions = {}
+    kem_alg = "Kyber768"
+
+    def __init__(self, backend=None, keys=None, sessions=None,
+                 session_mode=SESSION_STORED, seal_keys=None):
+        # Long-term KEM keys live in the keystore: restarts reuse them,
+        # and rotated-out keys keep decapsulating until they expire.
+        self.keys = keys or kem_keys()
+
+        # "stored": session keys live server-side, in-process by default
+        # (a SQLiteSessionStore shares them between worker processes).
+        # "stateless": the session id is the key sealed under a master
+        # KeyRing (`seal_keys`), so any node sharing the ring serves it.
+        if session_mode not in (SESSION_STORED, SESSION_STATELESS):
+            raise ValueError(f"unknown session mode {session_mode}")
+        self.session_mode = session_mode
+        if session_mode == SESSION_STATELESS:
+            self.sessions = StatelessSessions(seal_keys)
+            # Same ring (different AAD) so tickets resume on any node too
+            self.tickets = TicketSealer(keyring=self.sessions.keyring)
+        else:
+            self.sessions = sessions if sessions is not None else SessionStore()
+            self.tickets = TicketSealer()
+
+        # Optional crypto backend (e.g. ProcessCryptoBackend) for decap
+        self.backend = backend
+
+    def server_key(self):
+        """
+        (public key, key_id) of the key new clients should use.
+        """
+        key = self.keys.current()
+        return key.public_key, key.kid
+
+    @property
+    def key_id(self):
+        return self.keys.current().kid
 
     def get_server_pk(self):
-        return self.server_pk
+        return self.keys.current().public_key
+
+    def complete_handshake(self, ciphertext: bytes, key_id: str = None):
+        sid, _ = self.complete_handshake_resumable(ciphertext, key_id)
+        return sid
+
+    def complete_handshake_resumable(self, ciphertext: bytes, key_id: str = None):
+        """
+        Full handshake that also issues a resumption ticket.
+        Returns (session_id, ticket).
+        `key_id` names the server key the client encapsulated to;
+        StaleServerKey is raised if this server no longer holds it.
+        """
+        key = self.keys.current() if key_id is None else self.keys.get(key_id)
+        if key is None:
+            raise StaleServerKey(key_id)
+
+        if self.backend is not None:
+            shared_secret = self.backend.decap(key, ciphertext)
+        else:
+            shared_secret = key.decap(ciphertext)
+        session_id = self._open_session(shared_secret)
+        ticket = self.tickets.seal(derive_resumption_secret(shared_secret))
+        return session_id, ticket
+
+    def resume(self, ticket: bytes, client_nonce: bytes):
+        """
+        Abbreviated handshake: no KEM decapsulation.
+        Raises InvalidTicket if the ticket cannot be used.
+        """
+        resumption_secret = self.tickets.open(ticket)
+        return self._open_session(derive_resumed_key(resumption_secret, client_nonce))
+
+    def _open_session(self, key: bytes):
+        if self.session_mode == SESSION_STATELESS:
+            return self.sessions.open(key)
 
-    def complete_handshake(self, ciphertext: bytes):
-        shared_secret = self.kem.decap_secret(ciphertext)
         session_id = os.urandom(8).hex()
-        self.sessions[session_id] = SymmetricChannel(shared_secret)
+        self.sessions[session_id] = SymmetricChannel(key, is_server=True)
         return session_id
 
     def encrypt(self, sid, data: bytes):
-        return self.sessions[sid].encrypt(data)
+        with self.sessions.use(sid) as channel:
+            return channel.encrypt(data)
 
     def decrypt(self, sid, data: str):
-        return self.sessions[sid].decrypt(data)
+        with self.sessions.use(sid) as channel:
+            return channel.decrypt(data)
@@ -0,0 +1,448 @@
+# auth_server/keystore.py
+#
+# On-disk store for the auth server's long-term keys.
+#
+# Layout (one directory per purpose):
+#
+#   keys/<purpose>/<kid>.json   metadata + public key (0644)
+#   keys/<purpose>/<kid>.key    raw secret key        (0600)
+#
+# - Restarts reuse the keys on disk: no keygen, tokens stay valid.
+# - Several keys can be live at once. The newest one still inside its
+#   active window signs / is advertised; older ones keep verifying
+#   (or decapsulating) until they expire.
+# - Nothing is read at import time. Metadata is scanned on first use
+#   and secret keys are read only when a key is actually used.
+# - A background thread generates the next key shortly before the
+#   current one leaves its active window, so keygen never runs on a
+#   request path, and prunes expired keys.
+# - Processes sharing the directory (gunicorn workers, rolling
+#   deploys) see each other's keys; generation is serialised with a
+#   lock file so they do not all rotate at once.
+# - prepare_next() generates the successor ahead of time, inactive
+#   until the current key's rotate_at, so its fingerprint can be
+#   published (e.g. added to client pins) before it is served:
+#
+#     python -m auth_server.keystore --kind kem --prepare-next
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+
+from oqs import KeyEncapsulation, Signature
+
+BASE_DIR = os.path.dirname(__file__)
+KEYSTORE_DIR = os.environ.get("QS_KEYSTORE_DIR", os.path.join(BASE_DIR, "keys"))
+
+SIG_ALG = "Dilithium3"
+KEM_ALG = "Kyber768"
+
+# Signing keys: active for a day, then verify-only long enough
+# for every token they signed to expire.
+SIG_ROTATE_AFTER = 24 * 3600
+SIG_GRACE = 2 * 3600
+
+# KEM keys: clients may cache a key for KEY_MAX_AGE (1h), so old keys
+# keep decapsulating for at least that long after rotation.
+KEM_ROTATE_AFTER = 24 * 3600
+KEM_GRACE = 2 * 3600
+
+CHECK_INTERVAL = 60  # seconds between rotation checks
+RESCAN_INTERVAL = 1.0  # min seconds between rescans for unknown kids
+
+
+def kid_for(public_key: bytes) -> str:
+    return hashlib.sha256(public_key).hexdigest()[:16]
+
+
+def _write_atomic(path, data: bytes, mode):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+
+class ManagedKey:
+    __slots__ = (
+        "kid", "alg", "kind", "created", "rotate_at", "expires",
+        "public_key", "_path", "_obj", "_lock",
+    )
+
+    def __init__(self, meta, path):
+        self.kid = meta["kid"]
+        self.alg = meta["alg"]
+        self.kind = meta["kind"]
+        self.created = meta["created"]
+        self.rotate_at = meta["rotate_at"]
+        self.expires = meta["expires"]
+        self.public_key = bytes.fromhex(meta["public_key"])
+        self._path = path
+        self._obj = None
+        self._lock = threading.Lock()
+
+    def is_active(self, now):
+        return self.created <= now < self.rotate_at
+
+    def is_pending(self, now):
+        return now < self.created
+
+    def is_valid(self, now):
+        return now < self.expires
+
+    def _load(self):
+        """
+        liboqs object holding the secret key, built on first use.
+        """
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    with open(self._path + ".key", "rb") as f:
+                        secret_key = f.read()
+                    factory = Signature if self.kind == "sig" else KeyEncapsulation
+                    self._obj = factory(self.alg, secret_key=secret_key)
+        return self._obj
+
+    def sign(self, message: bytes) -> bytes:
+        return self._load().sign(message)
+
+    def decap(self, ciphertext: bytes) -> bytes:
+        return self._load().decap_secret(ciphertext)
+
+
+class KeyStore:
+    def __init__(self, root, kind, alg, rotate_after, grace, clock=time.time):
+        self.kind = kind
+        self.alg = alg
+        self.rotate_after = rotate_after
+        self.grace = grace
+        self.root = root
+        self.path = os.path.join(root, kind)
+        self._clock = clock
+
+        self._keys = None  # kid -> ManagedKey, loaded on first use
+        self._scanned_at = 0.0
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    # -------- loading --------
+
+    def _scan(self):
+        """
+        Re-reads metadata from disk, keeping already-loaded keys
+        (and their liboqs objects). Secret keys are not touched.
+        """
+        keys = {}
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            names = []
+
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            kid = name[:-5]
+            if self._keys and kid in self._keys:
+                keys[kid] = self._keys[kid]
+                continue
+            try:
+                with open(os.path.join(self.path, name), "r") as f:
+                    meta = json.load(f)
+                keys[kid] = ManagedKey(meta, os.path.join(self.path, kid))
+            except Exception:
+                # Half-written or foreign file: ignore
+                continue
+
+        self._keys = keys
+        self._scanned_at = time.monotonic()
+        return keys
+
+    def _loaded(self):
+        if self._keys is None:
+            with self._lock:
+                if self._keys is None:
+                    self._scan()
+        return self._keys
+
+    # -------- lookup --------
+
+    def current(self) -> ManagedKey:
+        """
+        Newest key inside its active window. Generates one only if
+        none exists (first start, or rotation thread not running).
+        """
+        key = self._newest_active()
+        if key is None:
+            with self._lock:
+                self._scan()
+                key = self._newest_active() or self._generate()
+        return key
+
+    def _newest_active(self):
+        now = self._clock()
+        active = [k for k in self._loaded().values() if k.is_active(now)]
+        return max(active, key=lambda k: k.created) if active else None
+
+    def pending(self):
+        """
+        Keys generated ahead of time that are not active yet, oldest first.
+        """
+        now = self._clock()
+        keys = [k for k in self._loaded().values() if k.is_pending(now)]
+        return sorted(keys, key=lambda k: k.created)
+
+    def get(self, kid, refresh=False):
+        """
+        Key `kid` if it is still valid for verification/decap, else None.
+        Unknown kids trigger a rescan (another process may have rotated);
+        `refresh` skips the rescan rate limit for kids from a trusted source.
+        """
+        key = self._loaded().get(kid)
+        if key is None and (refresh or time.monotonic() - self._scanned_at >= RESCAN_INTERVAL):
+            # Bounded: garbage kids cannot force a directory scan per request
+            with self._lock:
+                key = self._scan().get(kid)
+        if key is None or not key.is_valid(self._clock()):
+            return None
+        return key
+
+    def public_key(self, kid):
+        key = self.get(kid)
+        return None if key is None else key.public_key
+
+    def valid_keys(self):
+        now = self._clock()
+        keys = [k for k in self._loaded().values() if k.is_valid(now)]
+        return sorted(keys, key=lambda k: k.created, reverse=True)
+
+    # -------- generation / rotation --------
+
+    def _generate(self, force=False, start=None):
+        """
+        New key, active from `start` (default: now).
+        """
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Another process may have rotated while we waited
+                self._scan()
+                key = self._newest_active()
+                if not force and key is not None and key.rotate_at - self._clock() > self._lead():
+                    return key
+                if not force and key is not None and self.pending():
+                    # Generated ahead by prepare_next(): takes over at rotate_at
+                    return key
+
+                factory = Signature if self.kind == "sig" else KeyEncapsulation
+                obj = factory(self.alg)
+                public_key = obj.generate_keypair()
+                kid = kid_for(public_key)
+                now = self._clock() if start is None else start
+                meta = {
+                    "kid": kid,
+                    "alg": self.alg,
+                    "kind": self.kind,
+                    "created": now,
+                    "rotate_at": now + self.rotate_after,
+                    "expires": now + self.rotate_after + self.grace,
+                    "public_key": public_key.hex(),
+                }
+
+                base = os.path.join(self.path, kid)
+                _write_atomic(base + ".key", obj.export_secret_key(), 0o600)
+                _write_atomic(base + ".json", json.dumps(meta, indent=2).encode(), 0o644)
+
+                key = ManagedKey(meta, base)
+                key._obj = obj
+                # Copy-on-write: readers iterate the dict without the lock
+                self._keys = {**self._keys, kid: key}
+                return key
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def prepare_next(self) -> ManagedKey:
+        """
+        Generates the current key's successor now, active from the
+        current key's rotate_at. Returns the already pending one if
+        there is one.
+        """
+        with self._lock:
+            pending = self.pending()
+            if pending:
+                return pending[0]
+            return self._generate(force=True, start=self.current().rotate_at)
+
+    def _lead(self):
+        # Rotate this long before the active window closes
+        return 2 * CHECK_INTERVAL
+
+    def rotate(self, force=False):
+        """
+        Generates the next key if the current one is about to leave its
+        active window (or always, with force=True), then prunes expired
+        keys. Returns the current key.
+        """
+        with self._lock:
+            key = self.current()
+            if force or key.rotate_at - self._clock() <= self._lead():
+                key = self._generate(force)
+            self.prune()
+            return key
+
+    def prune(self):
+        """
+        Deletes expired keys from memory and disk.
+        """
+        now = self._clock()
+        with self._lock:
+            keys = self._loaded()
+            self._keys = {kid: k for kid, k in keys.items() if k.is_valid(now)}
+            for key in keys.values():
+                if key.is_valid(now):
+                    continue
+                for suffix in (".key", ".json"):
+                    try:
+                        os.remove(key._path + suffix)
+                    except FileNotFoundError:
+                        pass
+
+    def start_rotation(self, interval=CHECK_INTERVAL):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._rotation_loop, args=(interval,),
+            name=f"keystore-{self.kind}", daemon=True,
+        )
+        self._thread.start()
+
+    def _rotation_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                with self._lock:
+                    self._scan()
+                self.rotate()
+            except Exception:
+                # Never let rotation kill the thread; current() still
+                # generates inline if we fall behind.
+                pass
+
+    def stop_rotation(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def session_master_key(root=None) -> bytes:
+    """
+    Host-local key that wraps session keys in a shared session store.
+    QS_SESSION_MASTER_KEY (hex) wins; otherwise the first worker to get
+    here creates <keystore>/session_master.key (0600) and the rest read it.
+    """
+    env = os.environ.get("QS_SESSION_MASTER_KEY")
+    if env:
+        return bytes.fromhex(env)
+    return _host_secret("session_master.key", root)
+
+
+def session_db_path(root=None) -> str:
+    """
+    Default shared session database: <keystore>/sessions.db, in the
+    keystore's private (0700) directory next to session_master.key.
+    """
+    root = root or KEYSTORE_DIR
+    os.makedirs(root, mode=0o700, exist_ok=True)
+    return os.path.join(root, "sessions.db")
+
+
+def session_seal_keys(root=None) -> list:
+    """
+    Master keys for stateless session ids, newest (sealing) key first.
+    QS_SESSION_SEAL_KEYS is a comma-separated list of hex keys and must
+    be identical on every node; rotate by prepending a new key and drop
+    the old one once SESSION_LIFETIME has passed. Without it, a
+    host-local <keystore>/session_seal.key is used (single node only).
+    """
+    env = os.environ.get("QS_SESSION_SEAL_KEYS")
+    if env:
+        return [bytes.fromhex(k.strip()) for k in env.split(",") if k.strip()]
+    return [_host_secret("session_seal.key", root)]
+
+
+def _host_secret(name, root=None) -> bytes:
+    root = root or KEYSTORE_DIR
+    os.makedirs(root, mode=0o700, exist_ok=True)
+    path = os.path.join(root, name)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(50):
+            with open(path, "rb") as f:
+                key = f.read()
+            if len(key) == 32:
+                return key
+            time.sleep(0.01)  # creator is still writing it
+        raise ValueError(f"{path} is not a 32-byte key")
+
+    key = os.urandom(32)
+    try:
+        os.write(fd, key)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return key
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _store(kind, alg, rotate_after, grace, root=None):
+    root = root or KEYSTORE_DIR
+    with _stores_lock:
+        store = _stores.get((root, kind))
+        if store is None:
+            store = _stores[(root, kind)] = KeyStore(root, kind, alg, rotate_after, grace)
+        return store
+
+
+def signing_keys(root=None) -> KeyStore:
+    return _store("sig", SIG_ALG, SIG_ROTATE_AFTER, SIG_GRACE, root)
+
+
+def kem_keys(root=None) -> KeyStore:
+    return _store("kem", KEM_ALG, KEM_ROTATE_AFTER, KEM_GRACE, root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List keystore keys and fingerprints")
+    parser.add_argument("--kind", choices=("kem", "sig"), default="kem")
+    parser.add_argument("--prepare-next", action="store_true",
+                        help="generate the successor key now (inactive until rotation)")
+    args = parser.parse_args()
+
+    store = kem_keys() if args.kind == "kem" else signing_keys()
+    if args.prepare_next:
+        store.prepare_next()
+
+    now = time.time()
+    # Fingerprint = SHA-256 of the public key, as pinned by client/key_cache.py
+    for key in store.valid_keys():
+        state = "pending" if key.is_pending(now) else "active" if key.is_active(now) else "retired"
+        print(f"{key.kid}  {state:8} {hashlib.sha256(key.public_key).hexdigest()}  "
+              f"active {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(key.created))}"
+              f" .. {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(key.rotate_at))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# auth_server/token_cache.py
+#
+# LRU cache of already-verified tokens.
+#
+# Keyed by SHA-256 of the token bytes; an entry lives until the token's
+# own `exp`, so a token that is hot across many requests pays for one
+# Dilithium verification. Only successful verifications are cached:
+# a forged token costs a verification every time, and cannot push
+# genuine entries out.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CAPACITY = 50_000
+
+
+class _Entry:
+    __slots__ = ("claims", "exp")
+
+    def __init__(self, claims, exp):
+        self.claims = claims
+        self.exp = exp
+
+
+class VerifiedTokenCache:
+    def __init__(self, capacity=DEFAULT_CAPACITY, clock=time.time):
+        self.capacity = capacity
+        self._clock = clock
+        self._entries = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token):
+        if isinstance(token, str):
+            token = token.encode()
+        return hashlib.sha256(token).digest()
+
+    def get(self, token):
+        """
+        Cached claims for a still-valid token, else None.
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if self._clock() >= entry.exp:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.claims
+
+    def put(self, token, claims):
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+
+        with self._lock:
+            self._entries[self._key(token)] = _Entry(claims, exp)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def verify(self, token, verify):
+        """
+        Claims from the cache, or from `verify(token)` (which raises on
+        an invalid token) and then cached.
+        """
+        claims = self.get(token)
+        if claims is None:
+            claims = verify(token)
+            self.put(token, claims)
+        return claims
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,35 +1,123 @@
 # auth_server/token_service.py
 
-import time, json, base64
-from auth_server.jwks import get_signing_keypair
+import time, json, base64, threading
+from auth_server.keystore import signing_keys
+from auth_server.batch_signer import BatchSigner, batch_alg, BATCH_WINDOW_MS, MAX_BATCH
+from auth_server import cwt
+
+# Token encodings a client can ask for
+FORMAT_JWT = "jwt"
+FORMAT_CWT = "cwt"
 
 class TokenService:
-    def __init__(self):
-        self.pk, self.sig = get_signing_keypair()
+    alg = "Dilithium3"
+
+    def __init__(self, signer=None, keys=None):
+        # Signing keys come from the keystore; each token is signed by
+        # the current key and names it in its header (kid)
+        self.keys = keys or signing_keys()
+
+        # Optional crypto backend (e.g. ProcessCryptoBackend) for signing
+        self.signer = signer
+
+        # Optional Merkle batch signing (see enable_batching)
+        self.batch_options = None
+        self._batchers = {}  # kid -> BatchSigner (current + previous key)
+        self._batch_lock = threading.Lock()
+
+    @property
+    def pk(self):
+        return self.keys.current().public_key
+
+    def enable_batching(self, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        """
+        Sign tokens in Merkle batches: one signature per batch of up
+        to `max_batch` tokens requested within `window_ms`.
+        """
+        self.batch_options = (window_ms, max_batch)
+
+    def _batcher_for(self, key):
+        # A batch root must be signed by the key named in its tokens'
+        # headers, so each signing key gets its own batcher.
+        with self._batch_lock:
+            batcher = self._batchers.get(key.kid)
+            if batcher is not None:
+                return batcher
+
+            batcher = BatchSigner(lambda m: self._sign(key, m), *self.batch_options)
+            retired = list(self._batchers.values())[:-1]
+            self._batchers = {
+                **{k: b for k, b in self._batchers.items() if b not in retired},
+                key.kid: batcher,
+            }
+
+        # Two rotations old: nothing can still be queued on these
+        for old in retired:
+            old.close()
+        return batcher
+
+    def _sign(self, key, message: bytes) -> bytes:
+        if self.signer is not None:
+            return self.signer.sign(key, message)
+        return key.sign(message)
 
     def _b64url(self, data: bytes) -> bytes:
         return base64.urlsafe_b64encode(data).rstrip(b"=")
 
-    def create_id_token(self, subject, audience):
-        header = {
-            "alg": "Dilithium3",
-            "typ": "JWT"
-        }
+    def _token_alg(self):
+        return self.alg if self.batch_options is None else batch_alg(self.alg)
+
+    def _token_sign(self, key, message: bytes) -> bytes:
+        if self.batch_options is not None:
+            return self._batcher_for(key).sign(message)
+        return self._sign(key, message)
 
-        payload = {
+    def _claims(self, subject, audience):
+        now = int(time.time())
+        return {
             "iss": "auth",
             "sub": subject,
             "aud": audience,
-            "iat": int(time.time()),
-            "exp": int(time.time()) + 600
+            "iat": now,
+            "exp": now + 600
         }
 
+    def create_id_token(self, subject, audience):
+        key = self.keys.current()
+        header = {
+            "alg": self._token_alg(),
+            "typ": "JWT",
+            "kid": key.kid
+        }
+
+        payload = self._claims(subject, audience)
+
         h = self._b64url(json.dumps(header).encode())
         p = self._b64url(json.dumps(payload).encode())
 
         signing_input = h + b"." + p
 
-        signature = self.sig.sign(signing_input)
+        signature = self._token_sign(key, signing_input)
         s = self._b64url(signature)
 
         return signing_input.decode() + "." + s.decode()
+
+    def create_cwt(self, subject, audience) -> bytes:
+        """
+        Same claims as create_id_token, as a CBOR COSE_Sign1 token
+        with integer claim keys and a raw signature.
+        """
+        key = self.keys.current()
+        protected = cwt.protected_header(self._token_alg(), key.kid)
+        payload = cwt.encode_claims(self._claims(subject, audience))
+
+        signature = self._token_sign(key, cwt.signing_input(protected, payload))
+        return cwt.encode_sign1(protected, payload, signature)
+
+    def issue(self, subject, audience, fmt=FORMAT_JWT) -> bytes:
+        """
+        Token bytes in the requested format (unknown formats get a JWT).
+        """
+        if fmt == FORMAT_CWT:
+            return self.create_cwt(subject, audience)
+        return self.create_id_token(subject, audience).encode()
@@ -0,0 +1,128 @@
+# auth_server/token_verifier.py
+#
+# Verification for ID tokens issued by TokenService.
+#
+# Accepts plain Dilithium3 tokens and Merkle batch-signed tokens
+# (alg "MTB-Dilithium3"): the latter carry an inclusion proof that is
+# checked against a signed batch root. verify_cwt() does the same for
+# the CBOR / COSE_Sign1 encoding.
+#
+# `keys` is either the issuer public key (bytes) or a callable mapping
+# a token's kid to a public key (e.g. KeyStore.public_key), so tokens
+# signed by a rotated-out key keep verifying until that key expires.
+
+import base64
+import json
+import time
+
+from auth_server.batch_signer import base_alg, verify_batch_signature
+from auth_server import cwt
+from kemtls.oqs_pool import verifiers
+
+SUPPORTED_ALGS = ("Dilithium3",)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def verify_signature(alg, message: bytes, signature: bytes, pk: bytes) -> bool:
+    """
+    Checks `signature` over `message` for a plain or batch alg.
+    """
+    if not isinstance(alg, str):
+        raise InvalidToken("malformed token")
+    root_alg = base_alg(alg)
+    sig_alg = root_alg or alg
+    if sig_alg not in SUPPORTED_ALGS:
+        raise InvalidToken(f"unsupported alg {alg}")
+
+    with verifiers(sig_alg).borrow() as verifier:
+        def verify_root(signed, root_signature):
+            return verifier.verify(signed, root_signature, pk)
+
+        if root_alg is not None:
+            return verify_batch_signature(message, signature, verify_root)
+        return bool(verify_root(message, signature))
+
+
+def _resolve(keys, kid):
+    if not callable(keys):
+        return keys
+    pk = keys(kid) if isinstance(kid, str) else None
+    if pk is None:
+        raise InvalidToken("unknown kid")
+    return pk
+
+
+def verify_id_token(token: str, keys, audience=None, now=None):
+    """
+    Verifies a compact JWT from TokenService against the issuer
+    key(s). Returns the claims or raises InvalidToken.
+    """
+    try:
+        h, p, s = token.split(".")
+        header = json.loads(_b64url_decode(h))
+        claims = json.loads(_b64url_decode(p))
+        signature = _b64url_decode(s)
+    except Exception:
+        raise InvalidToken("malformed token")
+
+    if not isinstance(header, dict):
+        raise InvalidToken("malformed token")
+    pk = _resolve(keys, header.get("kid"))
+    if not verify_signature(header.get("alg", ""), (h + "." + p).encode(), signature, pk):
+        raise InvalidToken("bad signature")
+
+    return _check_claims(claims, audience, now)
+
+
+def verify_cwt(token: bytes, keys, audience=None, now=None):
+    """
+    Verifies a CBOR token from TokenService.create_cwt.
+    Returns the claims (string names) or raises InvalidToken.
+    """
+    try:
+        alg, kid, protected, payload, signature = cwt.decode_sign1(token)
+        claims = cwt.decode_claims(payload)
+    except Exception:
+        raise InvalidToken("malformed token")
+
+    pk = _resolve(keys, kid)
+    if not verify_signature(alg, cwt.signing_input(protected, payload), signature, pk):
+        raise InvalidToken("bad signature")
+
+    return _check_claims(claims, audience, now)
+
+
+def verify_token(token, keys, audience=None, now=None):
+    """
+    Verifies either encoding: a compact JWT (str with dots), or a
+    CWT as raw bytes or base64url text.
+    """
+    if isinstance(token, str):
+        if "." in token:
+            return verify_id_token(token, keys, audience, now)
+        try:
+            token = _b64url_decode(token)
+        except Exception:
+            raise InvalidToken("malformed token")
+    return verify_cwt(token, keys, audience, now)
+
+
+def _check_claims(claims, audience, now):
+    if not isinstance(claims, dict):
+        raise InvalidToken("malformed claims")
+
+    now = time.time() if now is None else now
+    exp = claims.get("exp")
+    if not isinstance(exp, (int, float)) or now >= exp:
+        raise InvalidToken("token expired")
+    if audience is not None and claims.get("aud") != audience:
+        raise InvalidToken("audience mismatch")
+
+    return claims
@@ -0,0 +1,266 @@
+# client/async_client.py
+#
+# asyncio KEMTLS client for the HTTP auth server.
+#
+# One process can drive thousands of concurrent handshake + token
+# flows over a single aiohttp connection pool. Every flow records
+# per-phase wall-clock timings (ms):
+#
+#   server_pk  GET /kemtls/server-pk   (key cache miss or refetch_key)
+#   handshake  POST /kemtls/handshake  (or /kemtls/resume)
+#   authorize  POST /authorize
+#   token      POST /token
+#
+# Usage: python -m client.async_client --count 1000 --concurrency 200
+
+import argparse
+import asyncio
+import os
+import time
+import weakref
+
+import aiohttp
+
+from kemtls.oqs_pool import encapsulators
+from crypto.stateless_session import channel_for
+from client.key_cache import default_key_cache
+from auth_server.cwt import MEDIA_TYPE as CWT_MEDIA_TYPE
+from crypto.tickets import (
+    CLIENT_NONCE_SIZE, derive_resumption_secret, derive_resumed_key,
+)
+
+BASE = "http://localhost:8000"
+KEM_ALG = "Kyber768"
+CONCURRENCY = 100
+
+# loop -> {endpoint: asyncio.Lock}: one server-pk fetch per endpoint
+# at a time, however many flows start cold together.
+_fetch_locks = weakref.WeakKeyDictionary()
+
+
+def _fetch_lock(endpoint):
+    locks = _fetch_locks.setdefault(asyncio.get_running_loop(), {})
+    lock = locks.get(endpoint)
+    if lock is None:
+        lock = locks[endpoint] = asyncio.Lock()
+    return lock
+
+
+class HandshakeError(Exception):
+    pass
+
+
+class AsyncKEMTLSClient:
+    def __init__(self, session, key_cache=None):
+        self.http = session
+        self.key_cache = key_cache or default_key_cache()
+        self.channel = None
+        self.sid = None
+        self.timings = {}
+
+        # Resumption state from the last full handshake
+        self.ticket = None
+        self.resumption_secret = None
+        self.ticket_expiry = 0
+
+    async def connect(self, base_url):
+        """
+        Resumes with a stored ticket when possible,
+        otherwise runs a full handshake.
+        """
+        sid = await self.resume(base_url)
+        if sid is None:
+            sid = await self.handshake(base_url)
+        return sid
+
+    async def fetch_server_key(self, base_url):
+        """
+        GET /kemtls/server-pk and store the result in the key cache.
+        Concurrent cold flows share a single fetch.
+        """
+        async with _fetch_lock(base_url):
+            cached = self.key_cache.get(base_url)
+            if cached is not None:
+                return cached
+            return await self._download_server_key(base_url)
+
+    async def _download_server_key(self, base_url):
+        t0 = time.perf_counter()
+        async with self.http.get(base_url + "/kemtls/server-pk") as r:
+            r.raise_for_status()
+            body = await r.json()
+        self.timings["server_pk"] = (time.perf_counter() - t0) * 1000
+
+        server_pk = bytes.fromhex(body["server_pk"])
+        key_id = body.get("key_id")
+        if key_id is not None:
+            self.key_cache.put(base_url, server_pk, key_id, body.get("max_age"))
+        else:
+            # Not cacheable, but still subject to the pin
+            self.key_cache.check_pin(base_url, server_pk)
+        return server_pk, key_id
+
+    async def handshake(self, base_url, refetch_key=False):
+        """
+        Full handshake. `refetch_key` skips the key cache and GETs
+        the server key first, as a first-time client would.
+        """
+        if refetch_key:
+            cached = None
+            server_pk, key_id = await self._download_server_key(base_url)
+        else:
+            cached = self.key_cache.get(base_url)
+            server_pk, key_id = cached or await self.fetch_server_key(base_url)
+
+        t0 = time.perf_counter()
+        status, body, shared_secret = await self._send_handshake(base_url, server_pk, key_id)
+
+        if status == 409 and not refetch_key:
+            # Server rotated its key since we cached it: refetch once
+            self.key_cache.invalidate(base_url)
+            server_pk, key_id = await self.fetch_server_key(base_url)
+            t0 = time.perf_counter()
+            status, body, shared_secret = await self._send_handshake(base_url, server_pk, key_id)
+
+        if status != 200:
+            raise HandshakeError(f"handshake failed with HTTP {status}")
+
+        self.sid = body["session_id"]
+        self.channel = channel_for(body.get("session_mode"), shared_secret)
+        self.timings["handshake"] = (time.perf_counter() - t0) * 1000
+
+        if "ticket" in body:
+            self.ticket = bytes.fromhex(body["ticket"])
+            self.resumption_secret = derive_resumption_secret(shared_secret)
+            self.ticket_expiry = time.time() + body.get("ticket_lifetime", 0)
+
+        return self.sid
+
+    async def _send_handshake(self, base_url, server_pk, key_id):
+        with encapsulators(KEM_ALG).borrow() as kem:
+            ciphertext, shared_secret = kem.encap_secret(server_pk)
+
+        async with self.http.post(
+            base_url + "/kemtls/handshake",
+            json={"ciphertext": ciphertext.hex(), "key_id": key_id}
+        ) as r:
+            body = await r.json() if r.status in (200, 409) else None
+            return r.status, body, shared_secret
+
+    async def resume(self, base_url):
+        """
+        Abbreviated handshake using a resumption ticket.
+        Returns the new session id, or None if a full
+        handshake is required.
+        """
+        if self.ticket is None or time.time() >= self.ticket_expiry:
+            return None
+
+        t0 = time.perf_counter()
+        nonce = os.urandom(CLIENT_NONCE_SIZE)
+        async with self.http.post(
+            base_url + "/kemtls/resume",
+            json={"ticket": self.ticket.hex(), "nonce": nonce.hex()}
+        ) as r:
+            if r.status != 200:
+                # Server rejected the ticket (expired, rotated key, restart)
+                self.ticket = None
+                self.resumption_secret = None
+                return None
+            body = await r.json()
+
+        self.sid = body["session_id"]
+        self.channel = channel_for(
+            body.get("session_mode"), derive_resumed_key(self.resumption_secret, nonce)
+        )
+        self.timings["handshake"] = (time.perf_counter() - t0) * 1000
+        return self.sid
+
+    async def authorize(self, base_url):
+        return await self._call(base_url + "/authorize", "authorize", b"x")
+
+    async def token(self, base_url, fmt="jwt"):
+        """
+        JWT (str), or the CBOR token (bytes) when fmt="cwt".
+        """
+        if fmt == "cwt":
+            return await self._call(base_url + "/token", "token", b"x", {"Accept": CWT_MEDIA_TYPE})
+        return (await self._call(base_url + "/token", "token", b"x")).decode()
+
+    async def _call(self, url, phase, body: bytes, headers=None):
+        # Records use sequence-number nonces: one request in
+        # flight per session, decrypted in order.
+        t0 = time.perf_counter()
+        async with self.http.post(
+            url,
+            json={"data": self.channel.encrypt(body)},
+            headers={"X-Session-ID": self.sid, **(headers or {})}
+        ) as r:
+            r.raise_for_status()
+            data = (await r.json())["data"]
+        plaintext = self.channel.decrypt(data)
+        self.timings[phase] = (time.perf_counter() - t0) * 1000
+        return plaintext
+
+
+async def run_flow(session, base_url=BASE, key_cache=None, refetch_key=False):
+    """
+    One full flow: handshake -> authorize -> token.
+    Returns the client's per-phase timings (ms).
+    """
+    client = AsyncKEMTLSClient(session, key_cache)
+    await client.handshake(base_url, refetch_key)
+    await client.authorize(base_url)
+    await client.token(base_url)
+    return client.timings
+
+
+async def run_flows(base_url=BASE, count=1, concurrency=CONCURRENCY, key_cache=None):
+    """
+    Runs `count` flows with at most `concurrency` in flight over one
+    shared connection pool. Returns one timings dict per flow, in
+    start order; failed flows carry an "error" key instead.
+    """
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    gate = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def one():
+            async with gate:
+                try:
+                    return await run_flow(session, base_url, key_cache)
+                except Exception as e:
+                    return {"error": repr(e)}
+
+        return await asyncio.gather(*(one() for _ in range(count)))
+
+
+def run(base_url=BASE, count=100, concurrency=CONCURRENCY):
+    t0 = time.perf_counter()
+    results = asyncio.run(run_flows(base_url, count, concurrency))
+    elapsed = time.perf_counter() - t0
+
+    ok = [r for r in results if "error" not in r]
+    print(f"Flows: {len(ok)}/{count} ok in {elapsed:.2f}s "
+          f"({len(ok) / elapsed:.1f} flows/s, concurrency {concurrency})")
+
+    for phase in ("server_pk", "handshake", "authorize", "token"):
+        samples = sorted(r[phase] for r in ok if phase in r)
+        if samples:
+            print(f"{phase:>10}: n={len(samples)} "
+                  f"mean={sum(samples) / len(samples):.2f}ms "
+                  f"p50={samples[len(samples) // 2]:.2f}ms "
+                  f"max={samples[-1]:.2f}ms")
+
+    errors = [r["error"] for r in results if "error" in r]
+    if errors:
+        print("First error:", errors[0])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent KEMTLS flows (asyncio)")
+    parser.add_argument("--url", default=BASE)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+    run(args.url, args.count, args.concurrency)
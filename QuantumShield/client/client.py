@@ -1,5 +1,5 @@
 
-import time, requests
+import time
 from client.kemtls_client import KEMTLSClient
 
 BASE="http://localhost:8000"
@@ -12,16 +12,18 @@ def run():
 
     h={"X-Session-ID":sid}
     a0=time.time()
-    r=requests.post(BASE+"/authorize",json={"data":kem.encrypt(b"x")},headers=h)
+    r=kem.http.post(BASE+"/authorize",json={"data":kem.encrypt(b"x")},headers=h)
     a1=time.time()
 
     t0b=time.time()
-    r2=requests.post(BASE+"/token",json={"data":kem.encrypt(b"x")},headers=h)
+    r2=kem.http.post(BASE+"/token",json={"data":kem.encrypt(b"x")},headers=h)
     t1b=time.time()
 
     print("Handshake latency:",t1-t0)
     print("Auth latency:",a1-a0)
     print("Token latency:",t1b-t0b)
+    # Records use sequence-number nonces: decrypt responses in order
+    kem.decrypt(r.json()["data"])
     jwt = kem.decrypt(r2.json()["data"])
     print("JWT size:", len(jwt))
 
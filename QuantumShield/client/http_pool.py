@@ -0,0 +1,39 @@
+# client/http_pool.py
+#
+# Shared keep-alive HTTP sessions for the KEMTLS client.
+#
+# Module-level requests.get / requests.post open a fresh TCP connection
+# per call; against the auth server that setup costs more than the KEM
+# itself. A pooled requests.Session reuses connections per host.
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = 32  # connections kept alive per host
+
+
+def pooled_session(pool_size=POOL_SIZE):
+    """
+    requests.Session with a keep-alive pool of `pool_size` connections
+    per host. Safe to share across threads.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_default_session = None
+_default_lock = threading.Lock()
+
+
+def default_session():
+    global _default_session
+    if _default_session is None:
+        with _default_lock:
+            if _default_session is None:
+                _default_session = pooled_session()
+    return _default_session
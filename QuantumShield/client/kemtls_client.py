@@ -1,32 +1,150 @@
 # client/kemtls_client.py
 
-import requests
-from oqs import KeyEncapsulation
-from crypto.symmetric import SymmetricChannel
+import os, time
+from kemtls.oqs_pool import encapsulators
+from crypto.stateless_session import channel_for
+from client.key_cache import default_key_cache
+from client.http_pool import default_session
+from auth_server.cwt import MEDIA_TYPE as CWT_MEDIA_TYPE
+from crypto.tickets import (
+    CLIENT_NONCE_SIZE, derive_resumption_secret, derive_resumed_key,
+)
+
+class HandshakeError(Exception):
+    pass
+
 
 class KEMTLSClient:
-    def __init__(self):
-        self.kem = KeyEncapsulation("Kyber768")
+    def __init__(self, key_cache=None, session=None):
+        self.key_cache = key_cache or default_key_cache()
+        # Keep-alive HTTP pool (shared across clients by default)
+        self.http = session or default_session()
         self.channel = None
         self.sid = None
 
+        # Resumption state from the last full handshake
+        self.ticket = None
+        self.resumption_secret = None
+        self.ticket_expiry = 0
+
+    def connect(self, base_url):
+        """
+        Resumes with a stored ticket when possible,
+        otherwise runs a full handshake.
+        """
+        sid = self.resume(base_url)
+        if sid is None:
+            sid = self.initiate_handshake(base_url)
+        return sid
+
+    def fetch_server_key(self, base_url):
+        """
+        GET /kemtls/server-pk and store the result in the key cache.
+        Raises KeyPinError if the key does not match a pin.
+        """
+        r = self.http.get(base_url + "/kemtls/server-pk")
+        body = r.json()
+        server_pk = bytes.fromhex(body["server_pk"])
+        key_id = body.get("key_id")
+        if key_id is not None:
+            self.key_cache.put(base_url, server_pk, key_id, body.get("max_age"))
+        else:
+            # Not cacheable, but still subject to the pin
+            self.key_cache.check_pin(base_url, server_pk)
+        return server_pk, key_id
+
     def initiate_handshake(self, base_url):
-        # Step 1: fetch server public key
-        r = requests.get(base_url + "/kemtls/server-pk")
-        server_pk = bytes.fromhex(r.json()["server_pk"])
+        # Step 1: server public key (cached keys skip the round trip)
+        cached = self.key_cache.get(base_url)
+        server_pk, key_id = cached or self.fetch_server_key(base_url)
 
         # Step 2: encapsulate
-        ciphertext, shared_secret = self.kem.encap_secret(server_pk)
+        r2, shared_secret = self._send_handshake(base_url, server_pk, key_id)
+
+        if r2.status_code == 409 and cached is not None:
+            # Server rotated its key since we cached it: refetch once
+            self.key_cache.invalidate(base_url)
+            server_pk, key_id = self.fetch_server_key(base_url)
+            r2, shared_secret = self._send_handshake(base_url, server_pk, key_id)
 
-        r2 = requests.post(
+        if r2.status_code != 200:
+            raise HandshakeError(f"handshake failed with HTTP {r2.status_code}")
+
+        body = r2.json()
+
+        self.sid = body["session_id"]
+        self.channel = channel_for(body.get("session_mode"), shared_secret)
+
+        if "ticket" in body:
+            self.ticket = bytes.fromhex(body["ticket"])
+            self.resumption_secret = derive_resumption_secret(shared_secret)
+            self.ticket_expiry = time.time() + body.get("ticket_lifetime", 0)
+
+        return self.sid
+
+    def _send_handshake(self, base_url, server_pk, key_id):
+        with encapsulators("Kyber768").borrow() as kem:
+            ciphertext, shared_secret = kem.encap_secret(server_pk)
+
+        r = self.http.post(
             base_url + "/kemtls/handshake",
-            json={"ciphertext": ciphertext.hex()}
+            json={"ciphertext": ciphertext.hex(), "key_id": key_id}
+        )
+        return r, shared_secret
+
+    def resume(self, base_url):
+        """
+        Abbreviated handshake using a resumption ticket.
+        Returns the new session id, or None if a full
+        handshake is required.
+        """
+        if self.ticket is None or time.time() >= self.ticket_expiry:
+            return None
+
+        nonce = os.urandom(CLIENT_NONCE_SIZE)
+        r = self.http.post(
+            base_url + "/kemtls/resume",
+            json={"ticket": self.ticket.hex(), "nonce": nonce.hex()}
         )
+        if r.status_code != 200:
+            # Server rejected the ticket (expired, rotated key, restart)
+            self.ticket = None
+            self.resumption_secret = None
+            return None
 
-        self.sid = r2.json()["session_id"]
-        self.channel = SymmetricChannel(shared_secret)
+        body = r.json()
+        self.sid = body["session_id"]
+        self.channel = channel_for(
+            body.get("session_mode"), derive_resumed_key(self.resumption_secret, nonce)
+        )
         return self.sid
 
+    def authorize(self, base_url):
+        """
+        POST /authorize over the current session; returns the auth code.
+        """
+        return self._call(base_url + "/authorize", b"x")
+
+    def token(self, base_url, fmt="jwt"):
+        """
+        POST /token over the current session. Returns the JWT (str),
+        or the CBOR token (bytes) when fmt="cwt".
+        """
+        if fmt == "cwt":
+            return self._call(base_url + "/token", b"x", {"Accept": CWT_MEDIA_TYPE})
+        return self._call(base_url + "/token", b"x").decode()
+
+    def _call(self, url, body: bytes, headers=None):
+        # One request in flight per session: records are decrypted
+        # in the order the server sealed them.
+        r = self.http.post(
+            url,
+            json={"data": self.encrypt(body)},
+            headers={"X-Session-ID": self.sid, **(headers or {})}
+        )
+        r.raise_for_status()
+        return self.decrypt(r.json()["data"])
+
     def encrypt(self, data: bytes):
         return self.channel.encrypt(data)
 
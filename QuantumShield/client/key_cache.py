@@ -0,0 +1,145 @@
+# client/key_cache.py
+#
+# Persistent cache of server KEM public keys, keyed by endpoint.
+#
+# Returning clients skip GET /kemtls/server-pk and go straight to the
+# handshake, sending the cached key_id so the server can reject a key
+# it no longer holds (the client then refetches once).
+#
+# Optional pins (endpoint -> SHA-256 fingerprint, or a set of them) are
+# enforced on every fetched key, cacheable or not; cached entries are
+# re-checked against their fingerprint and the pins when read back from
+# disk. path=None keeps the cache in memory only.
+#
+# The server's KEM key rotates (auth_server/keystore.py, daily by
+# default), so a pin on one key breaks at the first rotation. Pin the
+# current key AND its successor: the server generates the successor
+# ahead of time and prints both fingerprints with
+#
+#   python -m auth_server.keystore --kind kem --prepare-next
+#
+# then, after each rotation, drop the old fingerprint and add the new
+# successor's.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+BASE_DIR = os.path.dirname(__file__)
+CACHE_FILE = os.path.join(BASE_DIR, "server_keys.json")
+
+DEFAULT_TTL = 24 * 3600  # seconds
+
+
+class KeyPinError(Exception):
+    pass
+
+
+def fingerprint(server_pk: bytes) -> str:
+    return hashlib.sha256(server_pk).hexdigest()
+
+
+class ServerKeyCache:
+    def __init__(self, path=CACHE_FILE, ttl=DEFAULT_TTL, pins=None):
+        self.path = path
+        self.ttl = ttl
+        # endpoint -> frozenset of allowed fingerprints
+        self.pins = {
+            endpoint: frozenset([pin] if isinstance(pin, str) else pin)
+            for endpoint, pin in (pins or {}).items()
+        }
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            if self.path is None:
+                self._entries = {}
+                return self._entries
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except Exception:
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)
+        except Exception:
+            # Cache is an optimisation: never fail a handshake over it
+            pass
+
+    def get(self, endpoint):
+        """
+        Returns (server_pk, key_id) for a fresh, intact entry, else None.
+        """
+        with self._lock:
+            entry = self._load().get(endpoint)
+            if entry is None:
+                return None
+
+            if time.time() >= entry.get("expires", 0):
+                del self._entries[endpoint]
+                self._save()
+                return None
+
+            server_pk = bytes.fromhex(entry["server_pk"])
+            fp = fingerprint(server_pk)
+            pins = self.pins.get(endpoint)
+            if fp != entry.get("fingerprint") or (pins is not None and fp not in pins):
+                # Corrupted, or cached before the pin was set: refetch
+                del self._entries[endpoint]
+                self._save()
+                return None
+
+            return server_pk, entry["key_id"]
+
+    def check_pin(self, endpoint, server_pk: bytes) -> str:
+        """
+        Raises KeyPinError if `endpoint` is pinned to other keys.
+        Returns the key's fingerprint.
+        """
+        fp = fingerprint(server_pk)
+        pins = self.pins.get(endpoint)
+        if pins is not None and fp not in pins:
+            raise KeyPinError(f"server key for {endpoint} does not match any pinned fingerprint")
+        return fp
+
+    def put(self, endpoint, server_pk: bytes, key_id: str, max_age=None):
+        """
+        Stores a freshly fetched key after checking any pin.
+        """
+        fp = self.check_pin(endpoint, server_pk)
+        lifetime = self.ttl if max_age is None else min(self.ttl, max_age)
+
+        with self._lock:
+            self._load()[endpoint] = {
+                "server_pk": server_pk.hex(),
+                "key_id": key_id,
+                "fingerprint": fp,
+                "expires": time.time() + lifetime,
+            }
+            self._save()
+
+    def invalidate(self, endpoint):
+        with self._lock:
+            if self._load().pop(endpoint, None) is not None:
+                self._save()
+
+
+_default_cache = None
+
+
+def default_key_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ServerKeyCache()
+    return _default_cache
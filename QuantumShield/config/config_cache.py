@@ -0,0 +1,141 @@
+# config/config_cache.py
+#
+# In-process cache for small JSON config files (crypto policy, proof
+# mode, demo mode).
+#
+# - get() returns the parsed value held in memory; at most once per
+#   `interval` seconds it stats the file and reloads it only if the
+#   mtime / size / inode changed. Reads in between are an attribute
+#   lookup: no syscall, no JSON parse.
+# - The new value is built completely, then swapped in with a single
+#   assignment, so readers see either the old or the new config.
+# - A file that is missing means "defaults" (parse({})); a file that
+#   fails to parse (e.g. caught mid-write) keeps the last good value.
+# - subscribe(callback) runs callback(new, old) after every change.
+# - write(data) replaces the file atomically and swaps the new value in
+#   immediately, without waiting for the next mtime check.
+#
+# Files are shared per path: watch(path, parse) returns the same
+# ConfigFile to every caller.
+
+import json
+import os
+import threading
+import time
+
+CHECK_INTERVAL = float(os.environ.get("QS_CONFIG_CHECK_INTERVAL", "1.0"))  # seconds
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class ConfigFile:
+    def __init__(self, path, parse=lambda data: data, interval=CHECK_INTERVAL):
+        self.path = path
+        self.parse = parse
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._stamp = None
+        self._value = parse({})
+        self._checked_at = -interval
+        self.reloads = 0
+
+        self._refresh()
+
+    def get(self):
+        if time.monotonic() - self._checked_at >= self.interval:
+            self._refresh()
+        return self._value
+
+    def _refresh(self, force=False):
+        # One thread checks; the others keep using the current value
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            stamp = _stamp(self.path)
+            if stamp == self._stamp and not force:
+                return
+
+            if stamp is None:
+                value = self.parse({})
+            else:
+                try:
+                    with open(self.path, "r") as f:
+                        value = self.parse(json.load(f))
+                except Exception:
+                    # Torn or invalid file: keep the last good value and
+                    # retry on the next check
+                    return
+
+            self._stamp = stamp
+            self._swap(value)
+        finally:
+            self._lock.release()
+
+    def _swap(self, value):
+        old, self._value = self._value, value
+        self.reloads += 1
+        if value != old:
+            for callback in list(self._subscribers):
+                try:
+                    callback(value, old)
+                except Exception:
+                    pass
+
+    def reload(self):
+        """
+        Re-reads the file now, even if it looks unchanged.
+        """
+        self._refresh(force=True)
+        return self._value
+
+    def write(self, data):
+        """
+        Atomically replaces the file with `data` (JSON) and makes the
+        parsed value current in this process straight away. Other
+        processes pick it up at their next check.
+        """
+        value = self.parse(data)
+        with self._lock:
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+            self._stamp = _stamp(self.path)
+            self._checked_at = time.monotonic()
+            self._swap(value)
+        return value
+
+    def subscribe(self, callback):
+        """
+        callback(new_value, old_value) after each change. Returns a
+        function that unsubscribes.
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+
+_files = {}
+_files_lock = threading.Lock()
+
+
+def watch(path, parse=lambda data: data, interval=CHECK_INTERVAL) -> ConfigFile:
+    """
+    Shared ConfigFile for `path`. The first caller's `parse` wins.
+    """
+    path = os.path.abspath(path)
+    config = _files.get(path)
+    if config is None:
+        with _files_lock:
+            config = _files.get(path)
+            if config is None:
+                config = _files[path] = ConfigFile(path, parse, interval)
+    return config
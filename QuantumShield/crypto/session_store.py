@@ -0,0 +1,126 @@
+# crypto/session_store.py
+#
+# Bounded in-memory session table.
+#
+# - idle TTL: a session not used for `idle_ttl` seconds is dropped
+# - hard capacity: the least recently used session is evicted
+# - records use __slots__ (no per-entry __dict__)
+#
+# Drop-in for the plain `sessions` dicts: supports
+# store[sid] = channel, store[sid], `sid in store`, len(), pop().
+# A missing or expired session raises KeyError, exactly like the dict.
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_CAPACITY = 100_000
+DEFAULT_IDLE_TTL = 900  # seconds
+
+
+class SessionRecord:
+    __slots__ = ("channel", "last_used")
+
+    def __init__(self, channel, last_used):
+        self.channel = channel
+        self.last_used = last_used
+
+
+class SessionStore:
+    def __init__(self, capacity=DEFAULT_CAPACITY, idle_ttl=DEFAULT_IDLE_TTL,
+                 clock=time.monotonic):
+        self.capacity = capacity
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._records = OrderedDict()  # oldest access first
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __setitem__(self, sid, channel):
+        now = self._clock()
+        with self._lock:
+            self._records[sid] = SessionRecord(channel, now)
+            self._records.move_to_end(sid)
+            self._purge_expired(now)
+
+            while len(self._records) > self.capacity:
+                self._records.popitem(last=False)
+                self.evictions += 1
+
+    def __getitem__(self, sid):
+        now = self._clock()
+        with self._lock:
+            record = self._records.get(sid)
+
+            if record is None:
+                self.misses += 1
+                raise KeyError(sid)
+
+            if now - record.last_used > self.idle_ttl:
+                del self._records[sid]
+                self.expirations += 1
+                self.misses += 1
+                raise KeyError(sid)
+
+            record.last_used = now
+            self._records.move_to_end(sid)
+            self.hits += 1
+            return record.channel
+
+    @contextmanager
+    def use(self, sid):
+        """
+        Checks a session out for one operation. In memory the channel
+        object is shared, so there is nothing to write back; shared
+        backends (crypto/sqlite_session_store.py) persist state on exit.
+        """
+        yield self[sid]
+
+    def __contains__(self, sid):
+        record = self._records.get(sid)
+        return record is not None and self._clock() - record.last_used <= self.idle_ttl
+
+    def __len__(self):
+        return len(self._records)
+
+    def pop(self, sid, default=None):
+        with self._lock:
+            record = self._records.pop(sid, None)
+        return default if record is None else record.channel
+
+    def purge_expired(self):
+        """
+        Drops every idle session. Returns how many were removed.
+        """
+        with self._lock:
+            return self._purge_expired(self._clock())
+
+    def _purge_expired(self, now):
+        # Records are kept in access order, so expired ones are at the front
+        removed = 0
+        while self._records:
+            sid, record = next(iter(self._records.items()))
+            if now - record.last_used <= self.idle_ttl:
+                break
+            del self._records[sid]
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._records),
+            "capacity": self.capacity,
+            "idle_ttl": self.idle_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,225 @@
+# crypto/sqlite_session_store.py
+#
+# Session table shared by every worker process on one host.
+#
+# Same interface as SessionStore (store[sid] = channel, store[sid],
+# `sid in store`, len(), pop(), use(), purge_expired(), stats()), but
+# backed by SQLite in WAL mode, so a /token request can land on a
+# different gunicorn worker than its handshake.
+#
+# - The database must sit in a private directory (owned by this user,
+#   not group/world-writable) and be owned by this user: anyone who can
+#   write it could roll the sequence counters back and force nonce
+#   reuse. The auth server keeps it next to the keystore's master keys.
+# - Session keys are stored wrapped (AES-256-GCM under a host-local
+#   master key, bound to the session id); the database never holds a
+#   usable key.
+# - Sequence counters are persisted with the key. use(sid) holds the
+#   database write lock for one record operation and writes the
+#   counters back even if the operation fails, so no nonce is ever
+#   reused across workers.
+# - Sessions idle for longer than idle_ttl are treated as missing and
+#   purged periodically.
+
+import os
+import sqlite3
+import stat
+import threading
+import time
+from contextlib import contextmanager
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from crypto.symmetric import SymmetricChannel
+
+DEFAULT_IDLE_TTL = 900  # seconds
+PURGE_EVERY = 1000  # inserts between expiry sweeps
+
+_WRAP_NONCE = 12
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    sid       TEXT PRIMARY KEY,
+    wrapped   BLOB NOT NULL,
+    send_seq  INTEGER NOT NULL,
+    recv_seq  INTEGER NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def _check_private(path):
+    """
+    Creates `path` (0600) if missing. Raises PermissionError unless it
+    and its directory belong to this user and only this user can write
+    them (SQLite creates -wal / -shm files next to the database).
+    """
+    uid = os.getuid()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    st = os.stat(directory)
+    if st.st_uid != uid or st.st_mode & 0o022:
+        raise PermissionError(f"{directory} must be owned by uid {uid} and not group/world-writable")
+
+    try:
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600))
+    except FileExistsError:
+        pass
+
+    st = os.lstat(path)
+    if not stat.S_ISREG(st.st_mode) or st.st_uid != uid or st.st_mode & 0o022:
+        raise PermissionError(f"{path} must be a regular file owned by uid {uid}, not group/world-writable")
+
+
+class SQLiteSessionStore:
+    def __init__(self, master_key: bytes, path, idle_ttl=DEFAULT_IDLE_TTL,
+                 is_server=True, clock=time.time):
+        _check_private(path)
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.is_server = is_server
+        self._wrap = AESGCM(master_key)
+        self._clock = clock
+        self._local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self._inserts = 0
+
+        self._conn().execute(_SCHEMA)
+
+    def _conn(self):
+        # One connection per thread; WAL lets readers run alongside a writer
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # sessions do not outlive the host
+            self._local.conn = conn
+        return conn
+
+    # -------- key wrapping --------
+
+    def _seal_key(self, sid, key: bytes) -> bytes:
+        nonce = os.urandom(_WRAP_NONCE)
+        return nonce + self._wrap.encrypt(nonce, key, sid.encode())
+
+    def _open_key(self, sid, wrapped: bytes) -> bytes:
+        return self._wrap.decrypt(wrapped[:_WRAP_NONCE], wrapped[_WRAP_NONCE:], sid.encode())
+
+    # -------- dict-like interface --------
+
+    def __setitem__(self, sid, channel):
+        key, send_seq, recv_seq = channel.export_state()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)",
+            (sid, self._seal_key(sid, key), send_seq, recv_seq, self._clock()),
+        )
+
+        self._inserts += 1
+        if self._inserts % PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def _load(self, conn, sid, now):
+        row = conn.execute(
+            "SELECT wrapped, send_seq, recv_seq, last_used FROM sessions WHERE sid = ?",
+            (sid,),
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            raise KeyError(sid)
+
+        wrapped, send_seq, recv_seq, last_used = row
+        if now - last_used > self.idle_ttl:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+            self.expirations += 1
+            self.misses += 1
+            raise KeyError(sid)
+
+        self.hits += 1
+        return SymmetricChannel(self._open_key(sid, wrapped), self.is_server, send_seq, recv_seq)
+
+    def __getitem__(self, sid):
+        """
+        A detached copy of the session: state changes made through it
+        are NOT persisted. Use use(sid) for record operations.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            return self._load(conn, sid, self._clock())
+        finally:
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def use(self, sid):
+        """
+        Checks a session out for one operation and writes its sequence
+        numbers back afterwards. Raises KeyError if missing or expired.
+        """
+        conn = self._conn()
+        now = self._clock()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            channel = self._load(conn, sid, now)
+        except BaseException:
+            conn.execute("COMMIT")
+            raise
+
+        try:
+            yield channel
+        finally:
+            _, send_seq, recv_seq = channel.export_state()
+            conn.execute(
+                "UPDATE sessions SET send_seq = ?, recv_seq = ?, last_used = ? WHERE sid = ?",
+                (send_seq, recv_seq, now, sid),
+            )
+            conn.execute("COMMIT")
+
+    def __contains__(self, sid):
+        row = self._conn().execute(
+            "SELECT last_used FROM sessions WHERE sid = ?", (sid,)
+        ).fetchone()
+        return row is not None and self._clock() - row[0] <= self.idle_ttl
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def pop(self, sid, default=None):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            channel = self._load(conn, sid, self._clock())
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+        except KeyError:
+            channel = default
+        finally:
+            conn.execute("COMMIT")
+        return channel
+
+    def purge_expired(self):
+        """
+        Drops every idle session. Returns how many were removed.
+        """
+        cur = self._conn().execute(
+            "DELETE FROM sessions WHERE last_used < ?", (self._clock() - self.idle_ttl,)
+        )
+        self.expirations += cur.rowcount
+        return cur.rowcount
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": len(self),
+            "idle_ttl": self.idle_ttl,
+            # per-process counters
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,146 @@
+# crypto/stateless_session.py
+#
+# Stateless sessions: the session id IS the session.
+#
+# Instead of storing the session key server-side, the server seals it
+# (with an expiry) under a master key from a KeyRing and hands the
+# sealed blob out as X-Session-ID. Any node holding the ring can open
+# it, so requests need no sticky routing and no shared session table.
+#
+#   sid = base64url(kid || nonce || AES-GCM(expiry || session_key))
+#
+# With no per-session state there are no sequence counters to keep
+# nonces unique, so every record carries a random 16-byte salt and is
+# sealed under its own key HMAC(session_key, direction || salt).
+# Costs of going stateless:
+#   - a session lives for a fixed lifetime from the handshake (no idle
+#     TTL, no server-side revocation short of retiring the master key)
+#   - records are not ordered and a request record can be replayed
+#     while its session is valid
+#
+# Master-key rotation: add the new key to the ring as current on every
+# node; ids sealed under older keys keep opening until those keys are
+# retired (wait at least SESSION_LIFETIME).
+
+import base64
+import hashlib
+import hmac
+import os
+from contextlib import contextmanager
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from crypto.symmetric import SymmetricChannel
+from crypto.tickets import TicketSealer, KeyRing, InvalidTicket
+
+SESSION_STORED = "stored"
+SESSION_STATELESS = "stateless"
+
+SESSION_LIFETIME = 900  # seconds
+SALT_SIZE = 16
+
+_SESSION_AAD = b"quantumshield session v1"
+_ZERO_NONCE = bytes(12)  # every record key is used once
+_CLIENT_LABEL = b"qs stateless c2s"
+_SERVER_LABEL = b"qs stateless s2c"
+
+
+class StatelessChannel:
+    """
+    Same encrypt/decrypt interface as SymmetricChannel, without
+    sequence state: records can be sealed and opened in any order,
+    by any process that knows the key.
+    """
+
+    __slots__ = ("_key", "_send_label", "_recv_label")
+
+    def __init__(self, key: bytes, is_server: bool = False):
+        self._key = key
+        if is_server:
+            self._send_label, self._recv_label = _SERVER_LABEL, _CLIENT_LABEL
+        else:
+            self._send_label, self._recv_label = _CLIENT_LABEL, _SERVER_LABEL
+
+    def _record_key(self, label, salt):
+        return AESGCM(hmac.new(self._key, label + salt, hashlib.sha256).digest())
+
+    def encrypt(self, plaintext: bytes):
+        salt = os.urandom(SALT_SIZE)
+        record = self._record_key(self._send_label, salt).encrypt(_ZERO_NONCE, plaintext, salt)
+        return base64.b64encode(salt + record).decode()
+
+    def decrypt(self, ciphertext_b64: str):
+        record = base64.b64decode(ciphertext_b64)
+        salt = record[:SALT_SIZE]
+        return self._record_key(self._recv_label, salt).decrypt(_ZERO_NONCE, record[SALT_SIZE:], salt)
+
+
+def channel_for(mode, key: bytes, is_server: bool = False):
+    """
+    Record channel for a session in `mode` (as reported by the server's
+    handshake response; missing means stored).
+    """
+    if mode == SESSION_STATELESS:
+        return StatelessChannel(key, is_server)
+    return SymmetricChannel(key, is_server)
+
+
+class StatelessSessions:
+    """
+    Session "store" for KEMTLSServer in stateless mode: open() seals a
+    key into a session id, use(sid) opens it again. Raises KeyError
+    for forged, expired or retired ids, like the stored backends.
+    """
+
+    def __init__(self, keyring=None, lifetime=SESSION_LIFETIME):
+        self.keyring = keyring or KeyRing()
+        self.lifetime = lifetime
+        self._sealer = TicketSealer(lifetime, keyring=self.keyring, aad=_SESSION_AAD)
+
+        self.opened = 0
+        self.rejected = 0
+
+    def open(self, key: bytes) -> str:
+        self.opened += 1
+        return base64.urlsafe_b64encode(self._sealer.seal(key)).rstrip(b"=").decode()
+
+    def _channel(self, sid):
+        try:
+            sealed = base64.urlsafe_b64decode(sid + "=" * (-len(sid) % 4))
+            key = self._sealer.open(sealed)
+        except (InvalidTicket, ValueError, TypeError):
+            self.rejected += 1
+            raise KeyError(sid)
+        return StatelessChannel(key, is_server=True)
+
+    @contextmanager
+    def use(self, sid):
+        yield self._channel(sid)
+
+    def __contains__(self, sid):
+        try:
+            self._channel(sid)
+        except KeyError:
+            return False
+        return True
+
+    def rotate(self, key: bytes = None) -> bytes:
+        """
+        Seals new ids under `key` (a fresh random key if None).
+        Returns its key id.
+        """
+        return self.keyring.add(key) if key else self.keyring.rotate()
+
+    def retire(self, kid: bytes):
+        self.keyring.retire(kid)
+
+    def stats(self):
+        return {
+            "backend": SESSION_STATELESS,
+            "lifetime": self.lifetime,
+            "master_keys": len(self.keyring.key_ids()),
+            "current_key": self.keyring.current()[0].hex(),
+            # per-process counters
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -1,17 +1,51 @@
 
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-import os, base64
+from crypto.key_schedule import derive_traffic_keys, RecordProtection, TAG_SIZE
+import base64
 
 class SymmetricChannel:
-    def __init__(self, key: bytes):
-        self.key = key[:32]
-        self.aesgcm = AESGCM(self.key)
+    __slots__ = ("_key", "_send", "_recv")
+
+    def __init__(self, key: bytes, is_server: bool = False, send_seq: int = 0, recv_seq: int = 0):
+        keys = derive_traffic_keys(key)
+        self._key = key
+        if is_server:
+            self._send = RecordProtection(keys.server_key, keys.server_iv, send_seq)
+            self._recv = RecordProtection(keys.client_key, keys.client_iv, recv_seq)
+        else:
+            self._send = RecordProtection(keys.client_key, keys.client_iv, send_seq)
+            self._recv = RecordProtection(keys.server_key, keys.server_iv, recv_seq)
+
+    def export_state(self):
+        """
+        (key, send_seq, recv_seq): everything needed to rebuild this
+        channel in another process with SymmetricChannel(key, is_server,
+        send_seq, recv_seq). The key is secret.
+        """
+        return self._key, self._send.seq, self._recv.seq
 
     def encrypt(self, plaintext: bytes):
-        nonce = os.urandom(12)
-        ct = self.aesgcm.encrypt(nonce, plaintext, None)
-        return base64.b64encode(nonce + ct).decode()
+        return base64.b64encode(self._send.seal(plaintext)).decode()
 
     def decrypt(self, ciphertext_b64: str):
-        raw = base64.b64decode(ciphertext_b64)
-        return self.aesgcm.decrypt(raw[:12], raw[12:], None)
+        return self._recv.open(base64.b64decode(ciphertext_b64))
+
+    # Binary zero-copy variants: raw records, no base64.
+    # `out` is a caller-owned bytearray / writable memoryview.
+
+    @staticmethod
+    def record_size(plaintext_len: int) -> int:
+        return plaintext_len + TAG_SIZE
+
+    def encrypt_into(self, plaintext, out) -> int:
+        return self._send.seal_into(plaintext, out)
+
+    def decrypt_into(self, record, out) -> int:
+        return self._recv.open_into(record, out)
+
+    # Batched records: one base64 encoding for the whole batch.
+
+    def encrypt_many(self, plaintexts) -> str:
+        return base64.b64encode(self._send.seal_many(plaintexts)).decode()
+
+    def decrypt_many(self, packed_b64: str) -> list:
+        return self._recv.open_many(base64.b64decode(packed_b64))
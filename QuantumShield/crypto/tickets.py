@@ -0,0 +1,143 @@
+# crypto/tickets.py
+#
+# Session resumption tickets.
+#
+# After a full KEMTLS handshake the server derives a resumption
+# secret from the KEM shared secret and seals it, together with an
+# expiry time, under a server-only ticket key. The client keeps the
+# opaque ticket plus its own copy of the resumption secret.
+#
+# On reconnect the client presents the ticket and a fresh nonce;
+# the server opens the ticket (one AES-GCM operation) and both sides
+# derive a new session key without any KEM decapsulation.
+#
+# Sealing keys live in a KeyRing: every ticket names the key that
+# sealed it, so a ring shared by several nodes can rotate to a new
+# key while tickets under the previous ones still open.
+
+import hashlib
+import hmac
+import os
+import struct
+import time
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.exceptions import InvalidTag
+
+TICKET_LIFETIME = 3600  # seconds
+NONCE_SIZE = 12
+CLIENT_NONCE_SIZE = 32
+KID_SIZE = 4
+
+_TICKET_AAD = b"quantumshield ticket v1"
+_EXPIRY = struct.Struct(">Q")
+
+
+class InvalidTicket(Exception):
+    pass
+
+
+def derive_resumption_secret(shared_secret: bytes) -> bytes:
+    """
+    Resumption secret bound to one full handshake.
+    """
+    return hmac.new(shared_secret, b"qs resumption", hashlib.sha256).digest()
+
+
+def derive_resumed_key(resumption_secret: bytes, client_nonce: bytes) -> bytes:
+    """
+    Fresh session key for one resumed connection.
+    """
+    if len(client_nonce) != CLIENT_NONCE_SIZE:
+        raise InvalidTicket("bad client nonce")
+    return hmac.new(
+        resumption_secret, b"qs resume" + client_nonce, hashlib.sha256
+    ).digest()
+
+
+def key_id(key: bytes) -> bytes:
+    return hashlib.sha256(b"qs sealing key" + key).digest()[:KID_SIZE]
+
+
+class KeyRing:
+    """
+    Sealing keys by id. The current key seals; every key in the ring
+    opens. Updates swap the whole dict, so readers never lock.
+    """
+
+    def __init__(self, keys=None):
+        self._keys = {}
+        self._current = None
+        for key in reversed(list(keys or [])):
+            self.add(key)
+        if self._current is None:
+            self.rotate()
+
+    def add(self, key: bytes, current=True) -> bytes:
+        kid = key_id(key)
+        self._keys = {**self._keys, kid: AESGCM(key)}
+        if current or self._current is None:
+            self._current = kid
+        return kid
+
+    def rotate(self) -> bytes:
+        """
+        Seals with a fresh random key from now on; older keys keep opening.
+        """
+        return self.add(AESGCM.generate_key(bit_length=256))
+
+    def retire(self, kid: bytes):
+        if kid != self._current:
+            self._keys = {k: v for k, v in self._keys.items() if k != kid}
+
+    def current(self):
+        kid = self._current
+        return kid, self._keys[kid]
+
+    def get(self, kid: bytes):
+        return self._keys.get(kid)
+
+    def key_ids(self):
+        return list(self._keys)
+
+
+class TicketSealer:
+    def __init__(self, lifetime=TICKET_LIFETIME, key: bytes = None, keyring=None, aad=_TICKET_AAD):
+        self.lifetime = lifetime
+        self.keyring = keyring or KeyRing([key] if key else None)
+        self.aad = aad
+
+    def seal(self, resumption_secret: bytes) -> bytes:
+        """
+        Returns an opaque ticket: kid || nonce || AES-GCM(expiry || secret).
+        """
+        kid, aes = self.keyring.current()
+        expiry = int(time.time()) + self.lifetime
+        nonce = os.urandom(NONCE_SIZE)
+        body = _EXPIRY.pack(expiry) + resumption_secret
+        return kid + nonce + aes.encrypt(nonce, body, self.aad)
+
+    def open(self, ticket: bytes) -> bytes:
+        """
+        Returns the resumption secret inside a ticket.
+        Raises InvalidTicket if forged, corrupted, expired or sealed
+        under a key that is no longer in the ring.
+        """
+        if len(ticket) <= KID_SIZE + NONCE_SIZE:
+            raise InvalidTicket("ticket too short")
+
+        aes = self.keyring.get(ticket[:KID_SIZE])
+        if aes is None:
+            raise InvalidTicket("unknown ticket key")
+
+        nonce = ticket[KID_SIZE:KID_SIZE + NONCE_SIZE]
+        try:
+            body = aes.decrypt(nonce, ticket[KID_SIZE + NONCE_SIZE:], self.aad)
+        except InvalidTag:
+            raise InvalidTicket("ticket authentication failed")
+
+        (expiry,) = _EXPIRY.unpack_from(body)
+        if time.time() > expiry:
+            raise InvalidTicket("ticket expired")
+
+        return body[_EXPIRY.size:]
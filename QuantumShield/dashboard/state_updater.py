@@ -1,6 +1,9 @@
 import json
 import os
 import datetime
+import threading
+
+from config.config_cache import watch
 
 BASE_DIR = os.path.dirname(__file__)
 STATE_FILE = os.path.join(BASE_DIR, "runtime_state.json")
@@ -16,17 +19,35 @@ def _load_json(path, default):
         return default
 
 
+# Serialises read-modify-write of the state file within a process
+_state_lock = threading.Lock()
+
+
 def _save_json(path, data):
+    # Write-then-rename: readers and other processes never see a torn file
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(path, "w") as f:
+        with open(tmp, "w") as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp, path)
     except Exception:
-        pass
+        try:
+            os.remove(tmp)
+        except Exception:
+            pass
+
+
+# Cached; demo_mode.json is re-checked (mtime) at most once a second
+_demo_mode = watch(
+    DEMO_FILE, lambda data: isinstance(data, dict) and bool(data.get("enabled", False))
+)
 
 
 def demo_mode_enabled():
-    data = _load_json(DEMO_FILE, {})
-    return bool(data.get("enabled", False))
+    try:
+        return _demo_mode.get()
+    except Exception:
+        return False
 
 
 def update_state(**kwargs):
@@ -34,10 +55,11 @@ def update_state(**kwargs):
     Updates runtime crypto posture (FAIL-OPEN).
     """
     try:
-        state = _load_json(STATE_FILE, {})
-        state.update(kwargs)
-        state["timestamp"] = datetime.datetime.utcnow().isoformat() + "Z"
-        _save_json(STATE_FILE, state)
+        with _state_lock:
+            state = _load_json(STATE_FILE, {})
+            state.update(kwargs)
+            state["timestamp"] = datetime.datetime.utcnow().isoformat() + "Z"
+            _save_json(STATE_FILE, state)
     except Exception:
         pass
 
@@ -1,11 +1,38 @@
+# failure_proof/proof_logger.py
+#
+# Cryptographic failure log (proof mode only).
+#
+# log_failure() never touches the disk on the calling thread. Failures
+# are coalesced in memory by (reason, context): identical failures
+# within one WINDOW become a single line in failures.log with a count
+# and first/last timestamps, written by a background thread, and the
+# dashboard state is updated once per window instead of per failure.
+# A flood of corrupt ciphertexts therefore costs a dict update each.
+#
+# The dashboard hears about failures whether or not proof mode is on;
+# request handlers must not call update_state() on failure paths
+# themselves (that is one state file rewrite per failure again).
+#
+# Memory is bounded: at most MAX_PENDING distinct failures are held
+# per window; further new ones are dropped and the number dropped is
+# written as its own record.
+
+import atexit
 import json
 import os
 import datetime
+import threading
+
+from config.config_cache import watch
 
 BASE_DIR = os.path.dirname(__file__)
 MODE_FILE = os.path.join(BASE_DIR, "mode.json")
 LOG_FILE = os.path.join(BASE_DIR, "failures.log")
 
+WINDOW = float(os.environ.get("QS_FAILURE_WINDOW", "1.0"))  # seconds
+MAX_PENDING = int(os.environ.get("QS_FAILURE_MAX_PENDING", "1000"))  # distinct failures
+DROPPED_REASON = "failures dropped (coalescing buffer full)"
+
 # Optional dashboard updater (FAIL-OPEN)
 try:
     from dashboard.state_updater import update_state
@@ -14,22 +41,172 @@ except Exception:
         pass
 
 
+def _parse_mode(data):
+    return isinstance(data, dict) and bool(data.get("enabled", False))
+
+
+# Cached; mode.json is re-checked (mtime) at most once a second
+_mode = watch(MODE_FILE, _parse_mode)
+
+
 def _proof_mode_enabled():
     """
     Returns True if cryptographic failure proof mode is enabled.
     Fail-safe: returns False on any error.
     """
     try:
-        with open(MODE_FILE, "r") as f:
-            data = json.load(f)
-            return bool(data.get("enabled", False))
+        return _mode.get()
     except Exception:
         return False
 
 
+def _now():
+    return datetime.datetime.utcnow().isoformat() + "Z"
+
+
+class _Pending:
+    __slots__ = ("reason", "context", "count", "first_seen", "last_seen")
+
+    def __init__(self, reason, context, timestamp):
+        self.reason = reason
+        self.context = context
+        self.count = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+
+
+class FailureAggregator:
+    def __init__(self, path=LOG_FILE, window=WINDOW, max_pending=MAX_PENDING):
+        self.path = path
+        self.window = window
+        self.max_pending = max_pending
+
+        self._pending = {}  # (reason, context json) -> _Pending
+        self._dropped = 0
+        self._latest = None  # newest reason, for the dashboard
+        self._lock = threading.Lock()
+
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="failure-logger", daemon=True)
+        self._thread.start()
+
+    def add(self, reason, context, record=True):
+        """
+        Counts one failure. With record=False (proof mode off) it only
+        reaches the dashboard, not failures.log.
+        """
+        if not record:
+            with self._lock:
+                self._latest = reason
+            return
+
+        key = (reason, json.dumps(context, sort_keys=True, default=str))
+        timestamp = _now()
+        with self._lock:
+            self._latest = reason
+            self.logged += 1
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry.count += 1
+                entry.last_seen = timestamp
+            elif len(self._pending) < self.max_pending:
+                self._pending[key] = _Pending(reason, context, timestamp)
+            else:
+                self._dropped += 1
+                self.dropped += 1
+
+    def _run(self):
+        while not self._stop.wait(self.window):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """
+        Writes everything coalesced so far (one line per distinct failure).
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            dropped, self._dropped = self._dropped, 0
+            latest, self._latest = self._latest, None
+
+        if latest is not None:
+            # Update dashboard state (observer-only), once per window
+            try:
+                update_state(
+                    status="crypto_failure",
+                    last_failure=latest
+                )
+            except Exception:
+                pass
+
+        if not pending and not dropped:
+            return
+
+        lines = [
+            json.dumps({
+                "timestamp": e.last_seen,
+                "reason": e.reason,
+                "context": e.context,
+                "count": e.count,
+                "first_seen": e.first_seen,
+                "last_seen": e.last_seen,
+            }, default=str) + "\n"
+            for e in pending.values()
+        ]
+        if dropped:
+            lines.append(json.dumps({
+                "timestamp": _now(), "reason": DROPPED_REASON, "context": {}, "count": dropped,
+            }) + "\n")
+
+        try:
+            # Append to failure log
+            with open(self.path, "a") as f:
+                f.write("".join(lines))
+            self.written += len(lines)
+        except Exception:
+            self.errors += len(lines)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "logged": self.logged,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "window": self.window,
+        }
+
+
+_aggregator = None
+_aggregator_pid = None
+_aggregator_lock = threading.Lock()
+
+
+def _get_aggregator():
+    # One per process; a forked child starts its own
+    global _aggregator, _aggregator_pid
+    if _aggregator is None or _aggregator_pid != os.getpid():
+        with _aggregator_lock:
+            if _aggregator is None or _aggregator_pid != os.getpid():
+                _aggregator = FailureAggregator()
+                _aggregator_pid = os.getpid()
+                atexit.register(_aggregator.close)
+    return _aggregator
+
+
 def log_failure(reason, context=None):
     """
-    Logs a cryptographic failure event if proof mode is enabled.
+    Logs a cryptographic failure event if proof mode is enabled, and
+    flags it on the dashboard either way (both from a background thread).
 
     Parameters:
     - reason (str): short description of failure
@@ -38,27 +215,14 @@ def log_failure(reason, context=None):
     This function MUST NEVER raise an exception.
     """
 
-    # Proof mode disabled → do nothing
-    if not _proof_mode_enabled():
-        return
-
     try:
-        entry = {
-            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-            "reason": reason,
-            "context": context or {}
-        }
-
-        # Append to failure log
-        with open(LOG_FILE, "a") as f:
-            f.write(json.dumps(entry) + "\n")
-
-        # Update dashboard state (observer-only)
-        update_state(
-            status="crypto_failure",
-            last_failure=reason
-        )
+        # Proof mode disabled → dashboard only, nothing in failures.log
+        _get_aggregator().add(reason, context or {}, record=_proof_mode_enabled())
 
     except Exception:
         # Fail-open: never affect authentication
         pass
+
+
+def failure_stats():
+    return _get_aggregator().stats()
@@ -0,0 +1,123 @@
+# kemtls/certificate.py
+#
+# Certified static KEM keys for implicitly authenticated KEMTLS.
+#
+# The server signs its long-term KEM public key ONCE with its
+# Dilithium key. Clients verify that certificate once, cache it,
+# and from then on authenticate the server by the fact that only
+# the holder of the certified KEM secret key can decapsulate and
+# produce the key-confirmation MAC. No signature per handshake.
+
+import hashlib
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from kemtls.framing import pack_fields, unpack_fields, FramingError
+from kemtls.oqs_pool import verifiers
+
+CERT_VERSION = b"qs-kem-cert-v1"
+CERT_LIFETIME = 30 * 24 * 3600  # seconds
+
+_TIME = struct.Struct(">Q")
+
+KEMCertificate = namedtuple(
+    "KEMCertificate", ["kem_alg", "key_id", "not_after", "kem_pk", "sig_alg"]
+)
+
+
+class CertificateError(Exception):
+    pass
+
+
+def key_id_for(kem_pk: bytes) -> bytes:
+    return hashlib.sha256(kem_pk).digest()[:8]
+
+
+def issue_kem_certificate(sig, sig_alg, kem_alg, kem_pk, lifetime=CERT_LIFETIME):
+    """
+    Signs `kem_pk` with the server signature object `sig`.
+    Returns the certificate blob sent to clients.
+    """
+    not_after = int(time.time()) + lifetime
+    body = pack_fields(
+        CERT_VERSION,
+        kem_alg.encode(),
+        key_id_for(kem_pk),
+        _TIME.pack(not_after),
+        kem_pk,
+        sig_alg.encode(),
+    )
+    return pack_fields(body, sig.sign(body))
+
+
+def parse_kem_certificate(blob: bytes):
+    """
+    Splits a certificate blob without checking the signature.
+    Returns (KEMCertificate, body, signature).
+    """
+    try:
+        body, signature = unpack_fields(blob)
+        version, kem_alg, key_id, not_after, kem_pk, sig_alg = unpack_fields(body)
+    except (ValueError, FramingError):
+        raise CertificateError("malformed certificate")
+
+    if version != CERT_VERSION:
+        raise CertificateError("unsupported certificate version")
+
+    cert = KEMCertificate(
+        kem_alg.decode(), key_id, _TIME.unpack(not_after)[0], kem_pk, sig_alg.decode()
+    )
+    return cert, body, signature
+
+
+def verify_kem_certificate(blob: bytes, sig_pk: bytes):
+    """
+    Verifies a certificate against the server's signature key.
+    Returns the KEMCertificate or raises CertificateError.
+    """
+    cert, body, signature = parse_kem_certificate(blob)
+
+    if time.time() > cert.not_after:
+        raise CertificateError("certificate expired")
+    if key_id_for(cert.kem_pk) != cert.key_id:
+        raise CertificateError("key id mismatch")
+    with verifiers(cert.sig_alg).borrow() as verifier:
+        valid = verifier.verify(body, signature, sig_pk)
+    if not valid:
+        raise CertificateError("bad certificate signature")
+
+    return cert
+
+
+class CertificateCache:
+    """
+    Remembers certificates that already verified, so a client pays
+    for one Dilithium verification per server key, not per handshake.
+    """
+
+    def __init__(self):
+        self._certs = {}
+        self._lock = threading.Lock()
+
+    def verify(self, blob: bytes, sig_pk: bytes):
+        cache_key = hashlib.sha256(sig_pk + blob).digest()
+
+        with self._lock:
+            cert = self._certs.get(cache_key)
+        if cert is not None and time.time() <= cert.not_after:
+            return cert
+
+        cert = verify_kem_certificate(blob, sig_pk)
+        with self._lock:
+            self._certs[cache_key] = cert
+        return cert
+
+    def clear(self):
+        with self._lock:
+            self._certs.clear()
+
+
+# Shared by every client in the process
+DEFAULT_CERT_CACHE = CertificateCache()
@@ -1,20 +1,52 @@
-import hashlib
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-import os
+from crypto.key_schedule import (
+    derive_traffic_keys, packed_size, RecordProtection, TAG_SIZE,
+)
 
 
 class SecureChannel:
-    def __init__(self, shared_secret: bytes):
-        # Derive symmetric key from KEM shared secret
-        self.key = hashlib.sha256(shared_secret).digest()
-        self.aes = AESGCM(self.key)
+    __slots__ = ("_send", "_recv")
+
+    def __init__(self, shared_secret: bytes, is_server: bool = False):
+        # Derive directional keys from KEM shared secret
+        keys = derive_traffic_keys(shared_secret)
+        client = RecordProtection(keys.client_key, keys.client_iv)
+        server = RecordProtection(keys.server_key, keys.server_iv)
+        self._send, self._recv = (server, client) if is_server else (client, server)
 
     def encrypt(self, plaintext: bytes) -> bytes:
-        nonce = os.urandom(12)
-        ciphertext = self.aes.encrypt(nonce, plaintext, None)
-        return nonce + ciphertext
+        # Nonce is implicit (IV xor sequence number): record = ciphertext || tag
+        return self._send.seal(plaintext)
 
     def decrypt(self, data: bytes) -> bytes:
-        nonce = data[:12]
-        ciphertext = data[12:]
-        return self.aes.decrypt(nonce, ciphertext, None)
+        return self._recv.open(data)
+
+    # ---- Zero-copy variants for large payloads ----
+    # `out` is a caller-owned bytearray / writable memoryview; the payload
+    # is written straight into it with no intermediate copies.
+
+    @staticmethod
+    def record_size(plaintext_len: int) -> int:
+        return plaintext_len + TAG_SIZE
+
+    @staticmethod
+    def packed_size(plaintext_lens) -> int:
+        return packed_size(plaintext_lens)
+
+    def encrypt_into(self, plaintext, out) -> int:
+        return self._send.seal_into(plaintext, out)
+
+    def decrypt_into(self, data, out) -> int:
+        return self._recv.open_into(data, out)
+
+    # ---- Batched records ----
+
+    def encrypt_many(self, plaintexts, out=None):
+        """
+        Encrypts many messages in one call.
+        Returns a packed buffer of length-prefixed records, or the
+        number of bytes written when a reusable `out` buffer is given.
+        """
+        return self._send.seal_many(plaintexts, out=out)
+
+    def decrypt_many(self, packed) -> list:
+        return self._recv.open_many(packed)
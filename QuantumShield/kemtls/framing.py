@@ -0,0 +1,113 @@
+# kemtls/framing.py
+#
+# Binary length-prefixed framing for KEMTLS over raw TCP.
+#
+# Every frame on the wire is:
+#
+#   +--------+----------------+-----------------+
+#   | type   | length         | payload         |
+#   | 1 byte | 4 bytes (BE)   | `length` bytes  |
+#   +--------+----------------+-----------------+
+#
+# No hex, no base64, no JSON: ciphertexts and records travel as raw bytes.
+
+import struct
+
+# Handshake frames
+SERVER_HELLO = 0x01
+CLIENT_KEM = 0x02
+SERVER_AUTH = 0x03
+
+# Post-handshake frames
+RECORD = 0x10
+ALERT = 0x15
+
+# Application operations carried inside encrypted RECORD frames
+OP_AUTHORIZE = 0x01
+OP_TOKEN = 0x02
+
+HEADER = struct.Struct(">BI")
+MAX_FRAME = 16 * 1024 * 1024
+
+_FIELD = struct.Struct(">H")
+
+
+class FramingError(Exception):
+    pass
+
+
+def encode_frame(frame_type: int, payload: bytes) -> bytes:
+    if len(payload) > MAX_FRAME:
+        raise FramingError("frame too large")
+    return HEADER.pack(frame_type, len(payload)) + payload
+
+
+def pack_fields(*fields: bytes) -> bytes:
+    """
+    Packs several byte strings into one payload,
+    each prefixed with a 2-byte length.
+    """
+    out = bytearray()
+    for field in fields:
+        out += _FIELD.pack(len(field))
+        out += field
+    return bytes(out)
+
+
+def unpack_fields(payload: bytes):
+    """
+    Inverse of pack_fields().
+    """
+    fields = []
+    view = memoryview(payload)
+    offset = 0
+    while offset < len(view):
+        if offset + _FIELD.size > len(view):
+            raise FramingError("truncated field header")
+        (size,) = _FIELD.unpack_from(view, offset)
+        offset += _FIELD.size
+        if offset + size > len(view):
+            raise FramingError("truncated field")
+        fields.append(bytes(view[offset:offset + size]))
+        offset += size
+    return fields
+
+
+async def read_frame(reader):
+    """
+    Reads one frame from an asyncio StreamReader.
+    Returns (frame_type, payload).
+    """
+    header = await reader.readexactly(HEADER.size)
+    frame_type, length = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise FramingError("frame too large")
+    payload = await reader.readexactly(length)
+    return frame_type, payload
+
+
+def _recv_exactly(sock, size: int) -> bytes:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("connection closed by peer")
+        received += n
+    return bytes(buf)
+
+
+def recv_frame(sock):
+    """
+    Reads one frame from a blocking socket.
+    Returns (frame_type, payload).
+    """
+    frame_type, length = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    if length > MAX_FRAME:
+        raise FramingError("frame too large")
+    return frame_type, _recv_exactly(sock, length)
+
+
+def send_frame(sock, frame_type: int, payload: bytes):
+    sock.sendall(encode_frame(frame_type, payload))
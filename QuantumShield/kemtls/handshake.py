@@ -1,41 +1,182 @@
 import hashlib
+import hmac
+import threading
+import time
 from oqs import KeyEncapsulation, Signature
 
+from crypto.key_schedule import derive_finished_key
+from kemtls.certificate import (
+    CERT_LIFETIME, issue_kem_certificate, parse_kem_certificate,
+)
+from kemtls.oqs_pool import encapsulators, verifiers
+
 KEM_ALG = "Kyber768"
 SIG_ALG = "Dilithium3"
 
 
-class KEMTLSHandshake:
-    def __init__(self):
-        # Server long-term keys
-        self.kem = KeyEncapsulation(KEM_ALG)
-        self.server_pk = self.kem.generate_keypair()
+class ClientHandshake:
+    """
+    Client-role handshake state.
+    Holds no keypairs: encapsulation and verification borrow
+    reusable liboqs objects from kemtls.oqs_pool.
+    """
+
+    def client_encapsulate(self, server_kem_pk: bytes):
+        """
+        Client performs KEM encapsulation.
+        """
+        with encapsulators(KEM_ALG).borrow() as kem:
+            ct, ss = kem.encap_secret(server_kem_pk)
+        return ct, ss
+
+    @staticmethod
+    def verify_server(sig_pk: bytes, signature: bytes, transcript: bytes):
+        """
+        Client verifies server authentication.
+        """
+        digest = hashlib.sha256(transcript).digest()
+        with verifiers(SIG_ALG).borrow() as sig:
+            return sig.verify(digest, signature, sig_pk)
+
+    @staticmethod
+    def verify_confirmation(shared_secret: bytes, mac: bytes, transcript: bytes):
+        """
+        Client checks the server's key-confirmation MAC.
+        """
+        expected = ServerHandshake.confirm_server(shared_secret, transcript)
+        return hmac.compare_digest(expected, mac)
+
+
+class ServerHandshake:
+    """
+    Server-role handshake state.
+    Long-term keypairs are generated lazily, on first use.
+    """
+
+    def __init__(self, key_pool=None):
+        self._kem = None
+        self._server_pk = None
+        self._sig = None
+        self._sig_pk = None
+        self._keygen_lock = threading.Lock()
+
+        # Ephemeral mode: per-handshake KEM keys from a pre-generated pool
+        self.key_pool = key_pool
+
+        # Implicit-auth mode: long-term KEM key signed once per
+        # half certificate lifetime
+        self.certificate = None
+        self._cert_renew_at = 0.0
+        self._cert_lock = threading.Lock()
+
+    # ---- Lazily generated server long-term keys ----
 
-        self.sig = Signature(SIG_ALG)
-        self.sig_pk = self.sig.generate_keypair()
+    def _ensure_kem(self):
+        if self._kem is None:
+            with self._keygen_lock:
+                if self._kem is None:
+                    kem = KeyEncapsulation(KEM_ALG)
+                    self._server_pk = kem.generate_keypair()
+                    self._kem = kem
+        return self._kem
+
+    def _ensure_sig(self):
+        if self._sig is None:
+            with self._keygen_lock:
+                if self._sig is None:
+                    sig = Signature(SIG_ALG)
+                    self._sig_pk = sig.generate_keypair()
+                    self._sig = sig
+        return self._sig
+
+    @property
+    def kem(self):
+        return self._ensure_kem()
+
+    @property
+    def server_pk(self):
+        self._ensure_kem()
+        return self._server_pk
+
+    @property
+    def sig(self):
+        return self._ensure_sig()
+
+    @property
+    def sig_pk(self):
+        self._ensure_sig()
+        return self._sig_pk
 
     def server_hello(self):
         """
         Server sends its public KEM key and signature key.
+        In ephemeral mode the KEM key is fresh and the returned
+        dict also carries the (server-local) "ephemeral" keypair.
         """
+        if self.key_pool is None:
+            return {
+                "kem_pk": self.server_pk,
+                "sig_pk": self.sig_pk
+            }
+
+        key = self.key_pool.acquire()
         return {
-            "kem_pk": self.server_pk,
-            "sig_pk": self.sig_pk
+            "kem_pk": key.public_key,
+            "sig_pk": self.sig_pk,
+            "ephemeral": key
         }
 
-    def client_encapsulate(self, server_kem_pk: bytes):
+    def certify_kem_key(self):
         """
-        Client performs KEM encapsulation.
+        Signs the long-term KEM key into a certificate (one Dilithium
+        signature for the lifetime of the key).
         """
-        kem = KeyEncapsulation(KEM_ALG)
-        ct, ss = kem.encap_secret(server_kem_pk)
-        return ct, ss
+        if self.key_pool is not None:
+            raise ValueError("ephemeral KEM keys cannot be certified")
+        certificate = issue_kem_certificate(
+            self.sig, SIG_ALG, KEM_ALG, self.server_pk
+        )
+        not_after = parse_kem_certificate(certificate)[0].not_after
+        self._cert_renew_at = not_after - CERT_LIFETIME / 2
+        self.certificate = certificate
+        return certificate
+
+    def certificate_due(self, now=None) -> bool:
+        """
+        True once less than half of the certificate's lifetime is left.
+        """
+        now = time.time() if now is None else now
+        return self.certificate is not None and now >= self._cert_renew_at
 
-    def server_decapsulate(self, ciphertext: bytes):
+    def current_certificate(self):
+        """
+        The KEM certificate, re-issued first if it is due: clients
+        reject it outright once it expires.
+        """
+        if self.certificate_due():
+            with self._cert_lock:
+                if self.certificate_due():
+                    self.certify_kem_key()
+        return self.certificate
+
+    def server_decapsulate(self, ciphertext: bytes, ephemeral=None):
         """
         Server performs KEM decapsulation.
         """
-        return self.kem.decap_secret(ciphertext)
+        if ephemeral is None:
+            return self.kem.decap_secret(ciphertext)
+
+        try:
+            return ephemeral.kem.decap_secret(ciphertext)
+        finally:
+            self.key_pool.release(ephemeral)
+
+    def abandon(self, ephemeral):
+        """
+        Returns an ephemeral key whose handshake never completed.
+        """
+        if ephemeral is not None:
+            self.key_pool.release(ephemeral)
 
     def authenticate_server(self, transcript: bytes):
         """
@@ -45,10 +186,17 @@ class KEMTLSHandshake:
         return self.sig.sign(digest)
 
     @staticmethod
-    def verify_server(sig_pk: bytes, signature: bytes, transcript: bytes):
+    def confirm_server(shared_secret: bytes, transcript: bytes):
         """
-        Client verifies server authentication.
+        Implicit authentication: server proves it decapsulated
+        by MACing the transcript with a key from the shared secret.
         """
-        sig = Signature(SIG_ALG)
         digest = hashlib.sha256(transcript).digest()
-        return sig.verify(digest, signature, sig_pk)
+        return hmac.new(derive_finished_key(shared_secret), digest, hashlib.sha256).digest()
+
+
+class KEMTLSHandshake(ServerHandshake, ClientHandshake):
+    """
+    Both roles in one object (kept for existing callers).
+    Server keys are still only generated when a server method needs them.
+    """
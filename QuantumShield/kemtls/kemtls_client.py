@@ -1,24 +1,48 @@
-from kemtls.handshake import KEMTLSHandshake
+from kemtls.handshake import ClientHandshake
 from kemtls.channel import SecureChannel
+from kemtls.certificate import DEFAULT_CERT_CACHE
 
 
 class KEMTLSClient:
-    def __init__(self):
-        self.handshake = KEMTLSHandshake()
+    def __init__(self, trusted_sig_pk: bytes = None, cert_cache=DEFAULT_CERT_CACHE):
+        # Client role only: no server keypairs are generated
+        self.handshake = ClientHandshake()
         self.channel = None
 
+        # Pinned server signature key (default: trust the one in hello)
+        self.trusted_sig_pk = trusted_sig_pk
+        self.cert_cache = cert_cache
+
     def initiate_handshake(self, server_hello: dict):
         """
         Client-side KEMTLS handshake.
+        With a "certificate" in the hello (implicit-auth mode) the KEM
+        key is taken from the verified, cached certificate.
         """
-        server_kem_pk = server_hello["kem_pk"]
-        server_sig_pk = server_hello["sig_pk"]
+        server_sig_pk = self.trusted_sig_pk or server_hello["sig_pk"]
+        certificate = server_hello.get("certificate")
+
+        if certificate is not None:
+            server_kem_pk = self.cert_cache.verify(certificate, server_sig_pk).kem_pk
+        else:
+            server_kem_pk = server_hello["kem_pk"]
 
         ct, shared_secret = self.handshake.client_encapsulate(server_kem_pk)
 
-        transcript = ct
+        transcript = server_kem_pk + ct
         return ct, shared_secret, transcript, server_sig_pk
 
+    @staticmethod
+    def verify_server_auth(server_hello: dict, server_sig_pk: bytes,
+                           shared_secret: bytes, auth: bytes, transcript: bytes):
+        """
+        Checks SERVER_AUTH: a key-confirmation MAC in implicit-auth
+        mode, otherwise a signature over the transcript.
+        """
+        if server_hello.get("certificate") is not None:
+            return ClientHandshake.verify_confirmation(shared_secret, auth, transcript)
+        return ClientHandshake.verify_server(server_sig_pk, auth, transcript)
+
     def finalize(self, shared_secret: bytes):
         """
         Finalize secure channel.
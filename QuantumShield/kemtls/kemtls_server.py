@@ -1,36 +1,113 @@
-from kemtls.handshake import KEMTLSHandshake
+import os
+
+from kemtls.handshake import ServerHandshake, KEM_ALG
 from kemtls.channel import SecureChannel
+from kemtls.key_pool import EphemeralKeyPool
+from crypto.session_store import SessionStore
 
 
 class KEMTLSServer:
-    def __init__(self):
-        self.handshake = KEMTLSHandshake()
-        self.sessions = {}
+    def __init__(self, ephemeral=False, implicit_auth=False, **pool_options):
+        """
+        ephemeral=True gives every handshake a fresh KEM keypair from a
+        background-refilled pool (forward secrecy). pool_options are
+        passed to EphemeralKeyPool (low_watermark, high_watermark, max_uses).
+
+        implicit_auth=True authenticates through a certified static KEM
+        key plus a key-confirmation MAC instead of signing every handshake.
+        """
+        if ephemeral and implicit_auth:
+            raise ValueError("implicit_auth needs a static, certified KEM key")
+
+        key_pool = None
+        if ephemeral:
+            key_pool = EphemeralKeyPool(KEM_ALG, **pool_options)
+
+        self.handshake = ServerHandshake(key_pool=key_pool)
+        self.sessions = SessionStore()
+
+        self.implicit_auth = implicit_auth
+        if implicit_auth:
+            self.handshake.certify_kem_key()
 
     def start_handshake(self):
         """
-        Server sends public KEM and signature keys.
+        Server sends public KEM and signature keys
+        (plus the KEM certificate in implicit-auth mode).
         """
-        return self.handshake.server_hello()
+        hello = self.handshake.server_hello()
+        if self.implicit_auth:
+            hello["certificate"] = self.handshake.current_certificate()
+        return hello
 
-    def complete_handshake(self, client_ct: bytes):
+    def certificate_due(self) -> bool:
+        """
+        True when the next start_handshake() will re-issue the KEM
+        certificate, so a cached server hello must be rebuilt.
+        """
+        return self.implicit_auth and self.handshake.certificate_due()
+
+    def complete_handshake(self, client_ct: bytes, hello: dict = None):
         """
         Complete KEMTLS handshake and establish secure channel.
+        `hello` is the dict returned by start_handshake() for this
+        connection (required in ephemeral mode).
+        Returns (session_id, auth).
         """
-        shared_secret = self.handshake.server_decapsulate(client_ct)
+        session_id, _, auth = self.accept(client_ct, hello)
+        return session_id, auth
 
-        transcript = client_ct
-        signature = self.handshake.authenticate_server(transcript)
+    def accept(self, client_ct: bytes, hello: dict = None):
+        """
+        Like complete_handshake(), but also returns the channel:
+        (session_id, channel, auth). Long-lived connections keep the
+        channel themselves, so the session store evicting the entry
+        (idle TTL, capacity) cannot cut them off.
+        """
+        if hello is None:
+            if self.handshake.key_pool is not None:
+                raise ValueError("ephemeral mode requires the connection's server hello")
+            hello = self.handshake.server_hello()
+        shared_secret = self.handshake.server_decapsulate(
+            client_ct, hello.get("ephemeral")
+        )
+
+        # Bind the KEM key the client encapsulated to
+        transcript = hello["kem_pk"] + client_ct
+
+        if self.implicit_auth:
+            # Only the holder of the certified KEM key can produce this
+            auth = self.handshake.confirm_server(shared_secret, transcript)
+        else:
+            auth = self.handshake.authenticate_server(transcript)
 
-        channel = SecureChannel(shared_secret)
-        session_id = id(channel)
+        channel = SecureChannel(shared_secret, is_server=True)
+        # Random, never reused: id(channel) could be recycled for a new
+        # connection once the old channel is evicted and collected
+        session_id = os.urandom(8).hex()
 
         self.sessions[session_id] = channel
 
-        return session_id, signature
+        return session_id, channel, auth
+
+    def abort_handshake(self, hello: dict):
+        """
+        Releases per-handshake state for a connection that went away.
+        """
+        self.handshake.abandon(hello.get("ephemeral"))
+
+    def key_pool_stats(self):
+        pool = self.handshake.key_pool
+        return pool.stats() if pool is not None else None
 
-    def send(self, session_id: int, plaintext: bytes) -> bytes:
+    def send(self, session_id: str, plaintext: bytes) -> bytes:
         return self.sessions[session_id].encrypt(plaintext)
 
-    def receive(self, session_id: int, ciphertext: bytes) -> bytes:
+    def receive(self, session_id: str, ciphertext: bytes) -> bytes:
         return self.sessions[session_id].decrypt(ciphertext)
+
+    def close_session(self, session_id: str):
+        """
+        Drops the secure channel for a finished connection.
+        """
+        self.sessions.pop(session_id, None)
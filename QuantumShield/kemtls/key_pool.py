@@ -0,0 +1,149 @@
+# kemtls/key_pool.py
+#
+# Pre-generated ephemeral KEM keypairs for forward-secret handshakes.
+#
+# A background thread keeps between `low_watermark` and
+# `high_watermark` unused keypairs ready, so keygen never sits on
+# the handshake latency path. Each keypair serves at most
+# `max_uses` handshakes and is then freed: compromising the server
+# later reveals nothing about sessions whose keys are gone.
+
+import threading
+import time
+from collections import deque
+
+from oqs import KeyEncapsulation
+
+DEFAULT_LOW_WATERMARK = 16
+DEFAULT_HIGH_WATERMARK = 64
+DEFAULT_MAX_USES = 1
+
+
+class EphemeralKey:
+    __slots__ = ("kem", "public_key", "issued", "completed")
+
+    def __init__(self, kem, public_key):
+        self.kem = kem
+        self.public_key = public_key
+        self.issued = 0
+        self.completed = 0
+
+
+class EphemeralKeyPool:
+    def __init__(self, alg, low_watermark=DEFAULT_LOW_WATERMARK,
+                 high_watermark=DEFAULT_HIGH_WATERMARK,
+                 max_uses=DEFAULT_MAX_USES, start=True):
+        if not 0 <= low_watermark <= high_watermark:
+            raise ValueError("need 0 <= low_watermark <= high_watermark")
+        if max_uses < 1:
+            raise ValueError("max_uses must be >= 1")
+
+        self.alg = alg
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.max_uses = max_uses
+
+        self._keys = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Metrics
+        self.generated = 0
+        self.acquired = 0
+        self.retired = 0
+        self.stalls = 0
+        self.stall_time_ms = 0.0
+
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(
+                target=self._refill_loop, name="kem-key-pool", daemon=True
+            )
+            self._thread.start()
+
+    def _generate(self):
+        kem = KeyEncapsulation(self.alg)
+        key = EphemeralKey(kem, kem.generate_keypair())
+        with self._cond:
+            self.generated += 1
+        return key
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and len(self._keys) >= self.low_watermark:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                missing = self.high_watermark - len(self._keys)
+
+            # Keygen outside the lock: acquire() is never blocked by it
+            for _ in range(missing):
+                key = self._generate()
+                with self._cond:
+                    if self._closed:
+                        return
+                    self._keys.append(key)
+
+    def acquire(self) -> EphemeralKey:
+        """
+        Returns a keypair for one handshake.
+        Pass it back to release() once decapsulation is done.
+        """
+        with self._cond:
+            key = self._keys[0] if self._keys else None
+            if key is not None:
+                key.issued += 1
+                if key.issued >= self.max_uses:
+                    self._keys.popleft()
+            if len(self._keys) < self.low_watermark:
+                self._cond.notify()
+            self.acquired += 1
+
+        if key is None:
+            # Pool ran dry: generate inline and record the stall.
+            # Callers on an event loop run acquire() in an executor.
+            start = time.perf_counter()
+            key = self._generate()
+            key.issued = 1
+            with self._cond:
+                self.stalls += 1
+                self.stall_time_ms += (time.perf_counter() - start) * 1000.0
+                if self.max_uses > 1:
+                    self._keys.append(key)
+
+        return key
+
+    def release(self, key: EphemeralKey):
+        """
+        Marks one handshake on `key` as finished.
+        The secret key is freed after its last permitted use.
+        """
+        with self._cond:
+            key.completed += 1
+            done = key.completed >= self.max_uses
+            if done:
+                self.retired += 1
+
+        if done:
+            free = getattr(key.kem, "free", None)
+            if free is not None:
+                free()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "depth": len(self._keys),
+            "low_watermark": self.low_watermark,
+            "high_watermark": self.high_watermark,
+            "max_uses": self.max_uses,
+            "generated": self.generated,
+            "acquired": self.acquired,
+            "retired": self.retired,
+            "stalls": self.stalls,
+            "stall_time_ms": round(self.stall_time_ms, 3),
+        }
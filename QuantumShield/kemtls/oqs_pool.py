@@ -0,0 +1,71 @@
+# kemtls/oqs_pool.py
+#
+# Reusable liboqs objects.
+#
+# Encapsulation and signature verification only need an algorithm
+# context, not a keypair, so the same KeyEncapsulation / Signature
+# object can serve many handshakes. Objects are borrowed for one
+# operation and handed back, which keeps them thread-safe without
+# constructing a new one per call.
+
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from oqs import KeyEncapsulation, Signature
+
+MAX_IDLE = 32
+
+
+class OQSObjectPool:
+    def __init__(self, factory, max_idle=MAX_IDLE):
+        self._factory = factory
+        self._idle = deque()
+        self.max_idle = max_idle
+        self.created = 0
+
+    def acquire(self):
+        try:
+            return self._idle.pop()
+        except IndexError:
+            self.created += 1
+            return self._factory()
+
+    def release(self, obj):
+        if len(self._idle) < self.max_idle:
+            self._idle.append(obj)
+
+    @contextmanager
+    def borrow(self):
+        obj = self.acquire()
+        try:
+            yield obj
+        finally:
+            self.release(obj)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(kind, alg, factory):
+    key = (kind, alg)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, OQSObjectPool(lambda: factory(alg)))
+    return pool
+
+
+def encapsulators(alg) -> OQSObjectPool:
+    """
+    Pool of keyless KeyEncapsulation objects for `alg`.
+    """
+    return _pool("kem", alg, KeyEncapsulation)
+
+
+def verifiers(alg) -> OQSObjectPool:
+    """
+    Pool of keyless Signature objects for `alg`.
+    """
+    return _pool("sig", alg, Signature)
@@ -0,0 +1,107 @@
+# kemtls_client_tcp.py
+#
+# KEMTLS client over raw TCP.
+# Performs the handshake once, then runs the OIDC-like
+# authorize + token calls over the same encrypted connection.
+
+import argparse
+import socket
+import time
+
+from kemtls.kemtls_client import KEMTLSClient
+from kemtls.framing import (
+    SERVER_HELLO, CLIENT_KEM, SERVER_AUTH, RECORD, ALERT,
+    OP_AUTHORIZE, OP_TOKEN,
+    recv_frame, send_frame, unpack_fields,
+)
+
+HOST = "localhost"
+PORT = 9999
+
+
+class KEMTLSConnection:
+    def __init__(self, host=HOST, port=PORT):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.client = KEMTLSClient()
+
+    def handshake(self):
+        """
+        SERVER_HELLO -> CLIENT_KEM -> SERVER_AUTH
+        """
+        frame_type, payload = self._expect(SERVER_HELLO)
+        fields = unpack_fields(payload)
+        hello = {"kem_pk": fields[0], "sig_pk": fields[1]}
+        if len(fields) > 2:
+            # Implicit-auth mode: certified KEM key
+            hello["certificate"] = fields[2]
+
+        ct, shared_secret, transcript, server_sig_pk = self.client.initiate_handshake(hello)
+        send_frame(self.sock, CLIENT_KEM, ct)
+
+        _, auth = self._expect(SERVER_AUTH)
+        if not self.client.verify_server_auth(
+            hello, server_sig_pk, shared_secret, auth, transcript
+        ):
+            raise ValueError("server authentication failed")
+
+        self.client.finalize(shared_secret)
+
+    def request(self, op: int, body: bytes = b"") -> bytes:
+        send_frame(self.sock, RECORD, self.client.encrypt(bytes([op]) + body))
+        _, record = self._expect(RECORD)
+        return self.client.decrypt(record)
+
+    def authorize(self) -> bytes:
+        return self.request(OP_AUTHORIZE)
+
+    def token(self, fmt: str = "jwt"):
+        """
+        JWT as str, or the CBOR token as bytes when fmt="cwt".
+        """
+        if fmt == "cwt":
+            return self.request(OP_TOKEN, b"cwt")
+        return self.request(OP_TOKEN).decode()
+
+    def close(self):
+        self.sock.close()
+
+    def _expect(self, expected: int):
+        frame_type, payload = recv_frame(self.sock)
+        if frame_type == ALERT:
+            raise ValueError(f"server alert: {payload.decode(errors='replace')}")
+        if frame_type != expected:
+            raise ValueError(f"unexpected frame type {frame_type}")
+        return frame_type, payload
+
+
+def run(host=HOST, port=PORT, fmt="jwt"):
+    conn = KEMTLSConnection(host, port)
+    try:
+        t0 = time.perf_counter()
+        conn.handshake()
+        t1 = time.perf_counter()
+
+        code = conn.authorize()
+        t2 = time.perf_counter()
+
+        token = conn.token(fmt)
+        t3 = time.perf_counter()
+    finally:
+        conn.close()
+
+    print("[+] KEMTLS handshake complete")
+    print("Handshake latency:", t1 - t0)
+    print("Auth latency:", t2 - t1, "code:", code)
+    print("Token latency:", t3 - t2)
+    print(f"{fmt.upper()} size:", len(token))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KEMTLS client (raw TCP)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--format", choices=["jwt", "cwt"], default="jwt",
+                        help="ID token encoding to request")
+    args = parser.parse_args()
+    run(args.host, args.port, args.format)
@@ -0,0 +1,236 @@
+# kemtls_server_tcp.py
+#
+# KEMTLS authorization server over raw TCP (asyncio).
+#
+# One TCP connection == one KEMTLS handshake == one persistent
+# encrypted channel. After the handshake the client sends
+# authorize / token requests as encrypted RECORD frames on the
+# same connection; no HTTP, JSON, hex or base64 on the wire.
+
+import argparse
+import asyncio
+
+from kemtls.kemtls_server import KEMTLSServer
+from kemtls.key_pool import (
+    DEFAULT_LOW_WATERMARK, DEFAULT_HIGH_WATERMARK, DEFAULT_MAX_USES,
+)
+from kemtls.framing import (
+    SERVER_HELLO, CLIENT_KEM, SERVER_AUTH, RECORD, ALERT,
+    OP_AUTHORIZE, OP_TOKEN,
+    encode_frame, pack_fields, read_frame,
+)
+from auth_server.token_service import TokenService, FORMAT_JWT
+
+# Optional dashboard updater (FAIL-OPEN)
+try:
+    from dashboard.state_updater import update_state
+except Exception:
+    def update_state(**kwargs):
+        pass
+
+# Optional failure-proof logger (FAIL-OPEN)
+try:
+    from failure_proof.proof_logger import log_failure
+except Exception:
+    def log_failure(*args, **kwargs):
+        pass
+
+# Optional audit logger (FAIL-OPEN)
+try:
+    from audit.transcript_logger import log_event
+except Exception:
+    def log_event(*args, **kwargs):
+        pass
+
+
+HOST = "0.0.0.0"
+PORT = 9999
+HANDSHAKE_TIMEOUT = 10.0  # seconds for the client to answer SERVER_HELLO
+
+
+class KEMTLSTCPServer:
+    def __init__(self, ephemeral=False, implicit_auth=False, **pool_options):
+        self.kemtls = KEMTLSServer(
+            ephemeral=ephemeral, implicit_auth=implicit_auth, **pool_options
+        )
+        self.tokens = TokenService()
+        self.ephemeral = ephemeral
+
+        # Static mode: server hello is identical for every connection
+        # (until the KEM certificate is renewed, in implicit-auth mode)
+        self.static_hello = None
+        if not ephemeral:
+            self._rebuild_hello()
+
+    def _rebuild_hello(self):
+        self.static_hello = self.kemtls.start_handshake()
+        self.hello_frame = self._hello_frame(self.static_hello)
+
+    @staticmethod
+    def _hello_frame(hello):
+        fields = [hello["kem_pk"], hello["sig_pk"]]
+        if hello.get("certificate") is not None:
+            fields.append(hello["certificate"])
+        return encode_frame(SERVER_HELLO, pack_fields(*fields))
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        peer = writer.get_extra_info("peername")
+        sid = channel = None
+        hello = self.static_hello
+
+        try:
+            # ---- Handshake ----
+            if hello is None:
+                # An empty key pool falls back to inline keygen: not on the loop
+                hello = await loop.run_in_executor(None, self.kemtls.start_handshake)
+                writer.write(self._hello_frame(hello))
+            else:
+                if self.kemtls.certificate_due():
+                    # Re-signing is a Dilithium signature: off the loop
+                    await loop.run_in_executor(None, self._rebuild_hello)
+                    hello = self.static_hello
+                writer.write(self.hello_frame)
+            await writer.drain()
+
+            # A client that never answers must not pin its ephemeral key
+            frame_type, ct = await asyncio.wait_for(read_frame(reader), HANDSHAKE_TIMEOUT)
+            if frame_type != CLIENT_KEM:
+                raise ValueError("expected CLIENT_KEM frame")
+
+            # liboqs calls release the GIL: keep decap + sign off the loop.
+            # From here on the ephemeral key (if any) is released by decap.
+            conn_hello, hello = hello, None
+            # SERVER_AUTH is a signature, or a MAC in implicit-auth mode
+            sid, channel, auth = await loop.run_in_executor(
+                None, self.kemtls.accept, ct, conn_hello
+            )
+
+            writer.write(encode_frame(SERVER_AUTH, auth))
+            await writer.drain()
+
+            log_event("kem_handshake", {
+                "transport": "tcp",
+                "session_id": str(sid),
+                "ciphertext_bytes": len(ct),
+            })
+
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            self._abort(hello)
+            writer.close()
+            return
+        except Exception as e:
+            self._abort(hello)
+            log_failure(
+                "KEMTLS handshake failed",
+                {"error": str(e), "transport": "tcp"}
+            )
+            writer.write(encode_frame(ALERT, b"handshake_failure"))
+            writer.close()
+            return
+
+        # ---- Application records over the established channel ----
+        # The connection holds its channel: no per-record store lookup
+        try:
+            while True:
+                frame_type, record = await read_frame(reader)
+                if frame_type != RECORD:
+                    raise ValueError("expected RECORD frame")
+
+                request = channel.decrypt(record)
+                response = await self.dispatch(loop, request)
+
+                writer.write(encode_frame(RECORD, channel.encrypt(response)))
+                await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            log_failure(
+                "KEMTLS record processing failed",
+                {"error": str(e), "peer": str(peer)}
+            )
+            writer.write(encode_frame(ALERT, b"record_failure"))
+        finally:
+            self.kemtls.close_session(sid)
+            writer.close()
+
+    def _abort(self, hello):
+        # Ephemeral keys handed out for a handshake that never decapsulated
+        if self.ephemeral and hello is not None:
+            self.kemtls.abort_handshake(hello)
+
+    async def dispatch(self, loop, request: bytes) -> bytes:
+        """
+        Routes a decrypted application request.
+        First byte is the operation, remainder is its body.
+        """
+        op = request[0] if request else None
+
+        if op == OP_AUTHORIZE:
+            return b"authcode"
+
+        if op == OP_TOKEN:
+            # Body selects the token format: b"cwt" or empty for a JWT
+            fmt = request[1:].decode(errors="replace") or FORMAT_JWT
+            return await loop.run_in_executor(
+                None, self.tokens.issue, "user", "client", fmt
+            )
+
+        raise ValueError(f"unknown operation: {op}")
+
+
+async def serve(host=HOST, port=PORT, ephemeral=False, implicit_auth=False,
+                **pool_options):
+    server = KEMTLSTCPServer(
+        ephemeral=ephemeral, implicit_auth=implicit_auth, **pool_options
+    )
+
+    try:
+        update_state(
+            transport="KEMTLS/TCP",
+            kem="Kyber768",
+            signature="Dilithium3",
+            hash="SHAKE256",
+            status="normal"
+        )
+    except Exception:
+        pass
+
+    tcp = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"[+] KEMTLS server listening on {host}:{port} (raw TCP, no TLS)")
+    async with tcp:
+        await tcp.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KEMTLS server (raw TCP)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--ephemeral", action="store_true",
+                        help="fresh KEM keypair per handshake (forward secrecy)")
+    parser.add_argument("--implicit-auth", action="store_true",
+                        help="certified static KEM key + MAC, no per-handshake signature")
+    parser.add_argument("--pool-low", type=int, default=DEFAULT_LOW_WATERMARK)
+    parser.add_argument("--pool-high", type=int, default=DEFAULT_HIGH_WATERMARK)
+    parser.add_argument("--key-max-uses", type=int, default=DEFAULT_MAX_USES)
+    args = parser.parse_args()
+
+    pool_options = {}
+    if args.ephemeral:
+        pool_options = {
+            "low_watermark": args.pool_low,
+            "high_watermark": args.pool_high,
+            "max_uses": args.key_max_uses,
+        }
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.ephemeral, args.implicit_auth, **pool_options
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# metrics/bench_crypto.py
+#
+# Microbenchmarks for every primitive the crypto policy can select.
+#
+#   KEM        keygen / encap / decap     Kyber*, ML-KEM-*
+#   Signature  keygen / sign / verify     Dilithium*, ML-DSA-*, Falcon-*
+#   AEAD       seal / open per record     AES-256-GCM
+#   Hash       digest per record          SHA256, SHA3-256, SHAKE256
+#
+# Only algorithms enabled in the local liboqs build are measured.
+# Results can be compared against a stored baseline (same machine):
+#
+#   python -m metrics.bench_crypto --json out.json
+#   python -m metrics.bench_crypto --save-baseline
+#   python -m metrics.bench_crypto --filter ML-KEM --repeat 11
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import time
+
+import oqs
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from metrics.bench_util import run_benchmark
+
+BASE_DIR = os.path.dirname(__file__)
+BASELINE_FILE = os.path.join(BASE_DIR, "crypto_baseline.json")
+
+KEM_FAMILIES = ("Kyber", "ML-KEM")
+SIG_FAMILIES = ("Dilithium", "ML-DSA", "Falcon")
+HASHES = ("SHA256", "SHA3-256", "SHAKE256")
+
+RECORD_SIZES = [64, 1024, 16384, 65536]
+SIGNED_MESSAGE = 1024  # bytes, roughly a JWT header + payload
+
+TARGET_RUN_SECONDS = 0.1
+REGRESSION_THRESHOLD = 0.10  # flag > 10% slower with disjoint CIs
+
+
+def _enabled(mechanisms, families):
+    return [m for m in mechanisms if m.startswith(families)]
+
+
+def kem_algorithms():
+    return _enabled(oqs.get_enabled_kem_mechanisms(), KEM_FAMILIES)
+
+
+def sig_algorithms():
+    return _enabled(oqs.get_enabled_sig_mechanisms(), SIG_FAMILIES)
+
+
+def _calibrate(func, target=TARGET_RUN_SECONDS):
+    """
+    Calls per timed run so one run lasts roughly `target` seconds.
+    """
+    start = time.perf_counter()
+    func()
+    once = max(time.perf_counter() - start, 1e-7)
+    return max(1, min(100_000, int(target / once)))
+
+
+def _bench(func, repeat):
+    return run_benchmark(func, number=_calibrate(func), repeat=repeat)
+
+
+# -------- primitives --------
+
+def bench_kem(alg, repeat):
+    kem = oqs.KeyEncapsulation(alg)
+    pk = kem.generate_keypair()
+    ct, _ = kem.encap_secret(pk)
+
+    def keygen():
+        k = oqs.KeyEncapsulation(alg)
+        k.generate_keypair()
+        k.free()
+
+    results = {
+        "keygen": _bench(keygen, repeat),
+        "encap": _bench(lambda: kem.encap_secret(pk), repeat),
+        "decap": _bench(lambda: kem.decap_secret(ct), repeat),
+        "sizes": {
+            "public_key": kem.details.get("length_public_key"),
+            "ciphertext": kem.details.get("length_ciphertext"),
+            "secret_key": kem.details.get("length_secret_key"),
+            "shared_secret": kem.details.get("length_shared_secret"),
+        },
+    }
+    kem.free()
+    return results
+
+
+def bench_sig(alg, repeat):
+    sig = oqs.Signature(alg)
+    pk = sig.generate_keypair()
+    message = os.urandom(SIGNED_MESSAGE)
+    signature = sig.sign(message)
+
+    def keygen():
+        s = oqs.Signature(alg)
+        s.generate_keypair()
+        s.free()
+
+    results = {
+        "keygen": _bench(keygen, repeat),
+        "sign": _bench(lambda: sig.sign(message), repeat),
+        "verify": _bench(lambda: sig.verify(message, signature, pk), repeat),
+        "sizes": {
+            "public_key": sig.details.get("length_public_key"),
+            "signature": len(signature),
+            "max_signature": sig.details.get("length_signature"),
+            "secret_key": sig.details.get("length_secret_key"),
+        },
+    }
+    sig.free()
+    return results
+
+
+def bench_aead(size, repeat):
+    aes = AESGCM(os.urandom(32))
+    nonce = os.urandom(12)
+    plaintext = os.urandom(size)
+    record = aes.encrypt(nonce, plaintext, None)
+
+    seal = _bench(lambda: aes.encrypt(nonce, plaintext, None), repeat)
+    opened = _bench(lambda: aes.decrypt(nonce, record, None), repeat)
+    for stats in (seal, opened):
+        stats["mb_per_sec"] = round(size * stats["ops_per_sec"] / 1e6, 1)
+
+    return {"seal": seal, "open": opened, "sizes": {"record": len(record)}}
+
+
+def _hasher(name):
+    if name == "SHAKE256":
+        return lambda data: hashlib.shake_256(data).digest(32)
+    return lambda data: hashlib.new(name.lower().replace("-", "_"), data).digest()
+
+
+def bench_hash(name, size, repeat):
+    digest = _hasher(name)
+    data = os.urandom(size)
+    stats = _bench(lambda: digest(data), repeat)
+    stats["mb_per_sec"] = round(size * stats["ops_per_sec"] / 1e6, 1)
+    return {"digest": stats}
+
+
+# -------- report --------
+
+def machine_info():
+    info = {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+    for key, getter in (("liboqs", "oqs_version"), ("liboqs_python", "oqs_python_version")):
+        try:
+            info[key] = getattr(oqs, getter)()
+        except Exception:
+            info[key] = None
+    try:
+        import cryptography
+        info["cryptography"] = cryptography.__version__
+    except Exception:
+        info["cryptography"] = None
+    return info
+
+
+def run_suite(repeat=7, name_filter=None):
+    def wanted(name):
+        return name_filter is None or name_filter.lower() in name.lower()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "repeat": repeat,
+        "results": {"kem": {}, "signature": {}, "aead": {}, "hash": {}},
+    }
+    results = report["results"]
+
+    for alg in kem_algorithms():
+        if wanted(alg):
+            results["kem"][alg] = bench_kem(alg, repeat)
+    for alg in sig_algorithms():
+        if wanted(alg):
+            results["signature"][alg] = bench_sig(alg, repeat)
+    if wanted("AES-256-GCM"):
+        for size in RECORD_SIZES:
+            results["aead"][f"AES-256-GCM/{size}"] = bench_aead(size, repeat)
+    for name in HASHES:
+        if wanted(name):
+            for size in RECORD_SIZES:
+                results["hash"][f"{name}/{size}"] = bench_hash(name, size, repeat)
+
+    return report
+
+
+def _operations(report):
+    """
+    Flattens results to {"kind/alg/op": stats}.
+    """
+    flat = {}
+    for kind, algs in report.get("results", {}).items():
+        for alg, ops in algs.items():
+            for op, stats in ops.items():
+                if op != "sizes":
+                    flat[f"{kind}/{alg}/{op}"] = stats
+    return flat
+
+
+def compare(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Ratio of current to baseline mean for every shared operation.
+    An operation is a regression (or improvement) only when it moved
+    by more than `threshold` AND the 95% confidence intervals do not
+    overlap.
+    """
+    current = _operations(report)
+    previous = _operations(baseline)
+
+    rows = {}
+    for key in sorted(current.keys() & previous.keys()):
+        now, then = current[key], previous[key]
+        ratio = now["mean_us"] / then["mean_us"] if then["mean_us"] else None
+
+        verdict = "same"
+        if ratio is not None:
+            if ratio > 1 + threshold and now["ci95_us"][0] > then["ci95_us"][1]:
+                verdict = "slower"
+            elif ratio < 1 - threshold and now["ci95_us"][1] < then["ci95_us"][0]:
+                verdict = "faster"
+
+        rows[key] = {
+            "baseline_mean_us": then["mean_us"],
+            "mean_us": now["mean_us"],
+            "ratio": round(ratio, 3) if ratio is not None else None,
+            "verdict": verdict,
+        }
+
+    return {
+        "baseline_timestamp": baseline.get("timestamp"),
+        "same_machine": baseline.get("machine", {}).get("platform") == report["machine"]["platform"],
+        "operations": rows,
+    }
+
+
+def print_report(report):
+    for key, stats in _operations(report).items():
+        lo, hi = stats["ci95_us"]
+        print(f"{key:40} {stats['mean_us']:12.3f} us  "
+              f"[{lo:.3f}, {hi:.3f}]  {stats['ops_per_sec']:>12} ops/s")
+
+    comparison = report.get("baseline")
+    if comparison:
+        print(f"\nAgainst baseline from {comparison['baseline_timestamp']}"
+              + ("" if comparison["same_machine"] else " (different machine)"))
+        for key, row in comparison["operations"].items():
+            if row["verdict"] != "same":
+                print(f"  {row['verdict']:6} {key:40} x{row['ratio']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PQC / AEAD / hash microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--filter", help="only algorithms whose name contains this")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    report = run_suite(args.repeat, args.filter)
+
+    try:
+        with open(args.baseline, "r") as f:
+            report["baseline"] = compare(report, json.load(f))
+    except FileNotFoundError:
+        pass
+
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({k: v for k, v in report.items() if k != "baseline"}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
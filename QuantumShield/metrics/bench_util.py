@@ -0,0 +1,63 @@
+import statistics
+import time
+
+# Two-sided 95% Student-t critical values, indexed by degrees of freedom
+_T95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571,
+    6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131,
+    16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+    25: 2.060, 30: 2.042,
+}
+
+
+def t95(df):
+    if df <= 0:
+        return float("nan")
+    if df in _T95:
+        return _T95[df]
+    if df > 30:
+        return 1.96
+    # between table entries: use the next lower df (conservative)
+    return _T95[max(k for k in _T95 if k < df)]
+
+
+def summarize(samples_us):
+    """
+    Summary statistics for per-operation timings (microseconds).
+    """
+    n = len(samples_us)
+    mean = statistics.fmean(samples_us)
+    stdev = statistics.stdev(samples_us) if n > 1 else 0.0
+    half_width = t95(n - 1) * stdev / (n ** 0.5) if n > 1 else 0.0
+
+    return {
+        "runs": n,
+        "mean_us": round(mean, 3),
+        "stdev_us": round(stdev, 3),
+        "ci95_us": [round(mean - half_width, 3), round(mean + half_width, 3)],
+        "median_us": round(statistics.median(samples_us), 3),
+        "min_us": round(min(samples_us), 3),
+        "ops_per_sec": round(1e6 / mean, 1) if mean > 0 else None,
+    }
+
+
+def run_benchmark(func, number=1000, repeat=7, warmup=1):
+    """
+    Times `func()` in `repeat` runs of `number` calls each,
+    after `warmup` untimed runs. Returns summarize() of the
+    per-call time of each run.
+    """
+    for _ in range(warmup):
+        for _ in range(number):
+            func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed * 1e6 / number)
+
+    return summarize(samples)
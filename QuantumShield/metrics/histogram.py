@@ -0,0 +1,121 @@
+# metrics/histogram.py
+#
+# HDR-style latency histogram.
+#
+# Values (integer microseconds) fall into log-linear buckets: each
+# power-of-two range is split into 2**k equal sub-buckets, so every
+# recorded value is kept to within ~10**-digits relative precision
+# whatever its magnitude. Counts are stored sparsely, which keeps the
+# histogram small, JSON-serialisable and mergeable across processes.
+
+import math
+
+SIGNIFICANT_DIGITS = 2
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    def __init__(self, significant_digits=SIGNIFICANT_DIGITS):
+        self.significant_digits = significant_digits
+        self._sub_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._half = 1 << (self._sub_bits - 1)
+
+        self.counts = {}
+        self.total = 0
+        self.min_us = None
+        self.max_us = 0
+        self.sum_us = 0
+
+    # -------- recording --------
+
+    def _index(self, value):
+        shift = max(0, value.bit_length() - self._sub_bits)
+        return shift * self._half + (value >> shift)
+
+    def _highest_equivalent(self, index):
+        shift = max(0, index // self._half - 1)
+        sub = index - shift * self._half
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value_us, count=1):
+        value = max(0, int(value_us))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum_us += value * count
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+        if value > self.max_us:
+            self.max_us = value
+
+    def record_ms(self, value_ms):
+        self.record(value_ms * 1000)
+
+    def merge(self, other):
+        if other.significant_digits != self.significant_digits:
+            raise ValueError("cannot merge histograms of different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    # -------- queries --------
+
+    def percentile(self, p):
+        """
+        Smallest recorded value (to bucket precision) with at least
+        p% of samples at or below it, in microseconds.
+        """
+        if self.total == 0:
+            return 0
+        target = max(1, math.ceil(self.total * p / 100.0))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_us)
+        return self.max_us
+
+    def mean(self):
+        return self.sum_us / self.total if self.total else 0.0
+
+    def summary(self, percentiles=PERCENTILES):
+        """
+        Count, mean, min, max and percentiles in milliseconds.
+        """
+        out = {
+            "count": self.total,
+            "mean_ms": round(self.mean() / 1000, 3),
+            "min_ms": round((self.min_us or 0) / 1000, 3),
+            "max_ms": round(self.max_us / 1000, 3),
+        }
+        for p in percentiles:
+            out[f"p{p:g}_ms"] = round(self.percentile(p) / 1000, 3)
+        return out
+
+    # -------- serialisation --------
+
+    def to_dict(self):
+        return {
+            "significant_digits": self.significant_digits,
+            "counts": {str(i): c for i, c in sorted(self.counts.items())},
+            "total": self.total,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+            "sum_us": self.sum_us,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data.get("significant_digits", SIGNIFICANT_DIGITS))
+        hist.counts = {int(i): c for i, c in data.get("counts", {}).items()}
+        hist.total = data.get("total", sum(hist.counts.values()))
+        hist.min_us = data.get("min_us")
+        hist.max_us = data.get("max_us", 0)
+        hist.sum_us = data.get("sum_us", 0)
+        return hist
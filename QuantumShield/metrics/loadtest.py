@@ -0,0 +1,264 @@
+# metrics/loadtest.py
+#
+# Load generator for the HTTP auth server.
+#
+# Each worker process runs an asyncio loop of AsyncKEMTLSClient flows
+# (server-pk -> handshake -> authorize -> token) and records one
+# LatencyHistogram per phase. The parent merges worker histograms and
+# reports throughput, error rate and p50/p90/p99/p99.9 per phase.
+#
+# Two load models:
+#   closed loop  --concurrency N        N flows always in flight
+#   open loop    --rate R               R flow arrivals/s in total,
+#                                       at most --concurrency in flight
+#
+# In open-loop mode the "flow" histogram is measured from each flow's
+# scheduled start, so queueing behind a saturated server shows up in
+# the latencies instead of silently lowering the offered load.
+#
+# Results go into the "loadtest" section of metrics/report.json
+# (and optionally --out <file>).
+#
+# Usage: python -m metrics.loadtest --workers 4 --concurrency 200 --duration 30
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+from client.async_client import run_flow
+from client.key_cache import ServerKeyCache
+from metrics.histogram import LatencyHistogram
+
+BASE_DIR = os.path.dirname(__file__)
+REPORT_FILE = os.path.join(BASE_DIR, "report.json")
+
+BASE = "http://localhost:8000"
+PHASES = ("server_pk", "handshake", "authorize", "token", "flow")
+START_DELAY = 1.0  # seconds for every worker to be up before the clock starts
+
+
+def _load_report():
+    try:
+        with open(REPORT_FILE, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_report(data):
+    try:
+        with open(REPORT_FILE, "w") as f:
+            json.dump(data, f, indent=2)
+    except Exception:
+        pass
+
+
+async def _drive(config, start_at):
+    histograms = {phase: LatencyHistogram() for phase in PHASES}
+    errors = {}
+    state = {"ok": 0, "failed": 0}
+
+    base_url = config["base_url"]
+    concurrency = config["concurrency"]
+    rate = config["rate"]
+    refetch_key = config["refetch_key"]
+
+    # Per-worker in-memory key cache: no cross-process file races
+    key_cache = ServerKeyCache(path=None)
+
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    loop = asyncio.get_running_loop()
+    t_start = loop.time()
+    t_warm = t_start + config["warmup"]
+    t_end = t_warm + config["duration"]
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=config["timeout"])
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+        async def one(scheduled):
+            try:
+                timings = await run_flow(session, base_url, key_cache, refetch_key)
+            except Exception as e:
+                if scheduled >= t_warm:
+                    state["failed"] += 1
+                    kind = type(e).__name__
+                    errors[kind] = errors.get(kind, 0) + 1
+                return
+            if scheduled < t_warm:
+                return
+            state["ok"] += 1
+            timings["flow"] = (loop.time() - scheduled) * 1000
+            for phase, ms in timings.items():
+                histograms[phase].record_ms(ms)
+
+        if rate:
+            # Open loop: fixed-interval arrivals, bounded in flight
+            gate = asyncio.Semaphore(concurrency)
+            interval = 1.0 / rate
+            tasks = set()
+
+            async def gated(scheduled):
+                async with gate:
+                    await one(scheduled)
+
+            scheduled = t_start
+            while scheduled < t_end:
+                delay = scheduled - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.ensure_future(gated(scheduled))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                scheduled += interval
+            if tasks:
+                await asyncio.gather(*tasks)
+        else:
+            # Closed loop: each slot starts its next flow when one ends
+            async def slot():
+                while loop.time() < t_end:
+                    await one(loop.time())
+
+            await asyncio.gather(*(slot() for _ in range(concurrency)))
+
+    return {
+        "ok": state["ok"],
+        "failed": state["failed"],
+        "errors": errors,
+        "histograms": {p: h.to_dict() for p, h in histograms.items() if h.total},
+    }
+
+
+def _worker(config, start_at):
+    return asyncio.run(_drive(config, start_at))
+
+
+def _split(total, parts):
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def run_loadtest(base_url=BASE, workers=1, concurrency=50, rate=None,
+                 duration=10.0, warmup=2.0, refetch_key=False, timeout=30.0):
+    """
+    Drives `base_url` from `workers` processes and returns the merged
+    report dict. `concurrency` and `rate` are totals across workers.
+    """
+    workers = max(1, min(workers, concurrency))
+    slots = _split(concurrency, workers)
+
+    configs = []
+    for i in range(workers):
+        configs.append({
+            "base_url": base_url,
+            "concurrency": slots[i],
+            "rate": rate * slots[i] / concurrency if rate else None,
+            "duration": duration,
+            "warmup": warmup,
+            "refetch_key": refetch_key,
+            "timeout": timeout,
+        })
+
+    start_at = time.time() + START_DELAY
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_worker, c, start_at) for c in configs]
+        results = [f.result() for f in futures]
+
+    merged = {phase: LatencyHistogram() for phase in PHASES}
+    ok = failed = 0
+    errors = {}
+    for r in results:
+        ok += r["ok"]
+        failed += r["failed"]
+        for kind, n in r["errors"].items():
+            errors[kind] = errors.get(kind, 0) + n
+        for phase, data in r["histograms"].items():
+            merged[phase].merge(LatencyHistogram.from_dict(data))
+
+    attempted = ok + failed
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "base_url": base_url,
+            "mode": "open" if rate else "closed",
+            "workers": workers,
+            "concurrency": concurrency,
+            "rate_per_sec": rate,
+            "duration_s": duration,
+            "warmup_s": warmup,
+            "refetch_key": refetch_key,
+        },
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "flows_ok": ok,
+        "flows_failed": failed,
+        "error_rate": round(failed / attempted, 6) if attempted else 0.0,
+        "errors": errors,
+        "throughput_flows_per_sec": round(ok / duration, 2) if duration else None,
+        "phases": {p: h.summary() for p, h in merged.items() if h.total},
+        "histograms": {p: h.to_dict() for p, h in merged.items() if h.total},
+    }
+
+
+def print_report(report):
+    cfg = report["config"]
+    load = f"rate {cfg['rate_per_sec']}/s" if cfg["mode"] == "open" else f"concurrency {cfg['concurrency']}"
+    print(f"Load test: {cfg['base_url']} ({cfg['mode']} loop, {load}, "
+          f"{cfg['workers']} workers, {cfg['duration_s']}s)")
+    print(f"Flows: {report['flows_ok']} ok, {report['flows_failed']} failed "
+          f"(error rate {report['error_rate'] * 100:.2f}%), "
+          f"{report['throughput_flows_per_sec']} flows/s")
+
+    print(f"{'phase':>10} {'count':>8} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'p99.9':>9} {'max':>9}")
+    for phase, s in report["phases"].items():
+        print(f"{phase:>10} {s['count']:>8} {s['mean_ms']:>9.2f} {s['p50_ms']:>9.2f} "
+              f"{s['p90_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['p99.9_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    for kind, n in report["errors"].items():
+        print(f"  error {kind}: {n}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KEMTLS auth server load test")
+    parser.add_argument("--url", default=BASE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="flows in flight, total across workers")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="target arrivals/s (open loop); omit for closed loop")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--refetch-key", action="store_true",
+                        help="GET /kemtls/server-pk in every flow (first-time clients)")
+    parser.add_argument("--out", help="also write the report to this file")
+    parser.add_argument("--no-save", action="store_true",
+                        help="do not update metrics/report.json")
+    args = parser.parse_args()
+
+    report = run_loadtest(
+        args.url, args.workers, args.concurrency, args.rate,
+        args.duration, args.warmup, args.refetch_key, args.timeout,
+    )
+    print_report(report)
+
+    if not args.no_save:
+        data = _load_report()
+        data["loadtest"] = report
+        _save_report(data)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import json
 import os
 
+from config.config_cache import watch
+
 # ---- Defaults (current working behavior) ----
 DEFAULT_POLICY = {
     "kem": "Kyber768",
@@ -14,47 +16,71 @@ _POLICY_PATH = os.path.join(
 )
 
 
-def _load_policy_file():
+def _parse_policy(file_policy):
     """
     Internal helper:
-    Loads policy JSON safely.
-    Never raises an exception.
+    Merges the policy file over the defaults.
+    Unknown keys and non-string values are ignored.
+    """
+    policy = DEFAULT_POLICY.copy()
+
+    if isinstance(file_policy, dict):
+        for key in DEFAULT_POLICY:
+            if key in file_policy and isinstance(file_policy[key], str):
+                policy[key] = file_policy[key]
+
+    return policy
+
+
+# Cached in memory; the file is re-checked (mtime) at most once a second.
+# A missing file means defaults; an invalid one keeps the last good policy.
+_policy = watch(_POLICY_PATH, _parse_policy)
+
+
+def get_crypto_policy():
+    """
+    Returns the active crypto policy (a copy).
+    If policy file is missing, defaults are returned.
+    """
+    return dict(_policy.get())
+
+
+def set_crypto_policy(policy):
+    """
+    Atomically replaces the policy file and switches this process
+    to the new policy immediately. Keys not in `policy` (including
+    version / description) are kept. Returns the effective policy.
     """
     try:
         with open(_POLICY_PATH, "r") as f:
             data = json.load(f)
-            return data
     except Exception:
-        # Fail-open: fall back to defaults
-        return {}
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
 
+    data.update(policy)
+    return dict(_policy.write(data))
 
-def get_crypto_policy():
+
+def subscribe(callback):
     """
-    Returns the active crypto policy.
-    If policy file is missing or invalid,
-    defaults are returned.
+    callback(new_policy, old_policy) whenever the policy changes.
+    Returns an unsubscribe function.
     """
-    policy = DEFAULT_POLICY.copy()
-    file_policy = _load_policy_file()
-
-    for key in DEFAULT_POLICY:
-        if key in file_policy and isinstance(file_policy[key], str):
-            policy[key] = file_policy[key]
-
-    return policy
+    return _policy.subscribe(callback)
 
 
 def get_kem():
     """Returns selected KEM algorithm"""
-    return get_crypto_policy()["kem"]
+    return _policy.get()["kem"]
 
 
 def get_signature():
     """Returns selected signature algorithm"""
-    return get_crypto_policy()["signature"]
+    return _policy.get()["signature"]
 
 
 def get_hash():
     """Returns selected hash function"""
-    return get_crypto_policy()["hash"]
+    return _policy.get()["hash"]
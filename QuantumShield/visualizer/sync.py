@@ -1,48 +1,172 @@
 import json
 import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit.transcript_logger import list_segments, SEGMENT_MAX_AGE
+
+# Incremental sync: a cursor in CURSOR_FILE remembers how far every
+# audit segment has been read (byte offset of the last complete line),
+# plus the last legacy one-file-per-event transcript, so each run only
+# parses records written since the previous one.
+#
+# Segments are written per process, so several can grow at once; each
+# keeps its own offset until it is sealed (fully read and untouched for
+# longer than a rotation period), after which only the `sealed`
+# watermark remembers it.
 
 # Paths
 BASE_DIR = os.path.dirname(__file__)
 AUDIT_DIR = os.path.join(BASE_DIR, "..", "audit", "transcripts")
 OUTPUT_FILE = os.path.join(BASE_DIR, "handshake_state.json")
+CURSOR_FILE = os.path.join(BASE_DIR, "sync_cursor.json")
 
+# Highest visualizer step (steps.json) each audit event proves reached
+EVENT_STEPS = {
+    "kem_handshake": 4,
+}
 
-def generate_handshake_state():
+MAX_SESSIONS = 1000  # most recently active sessions kept in the state
+SEAL_AFTER = SEGMENT_MAX_AGE + 60  # seconds without writes
+
+
+def _load_cursor():
+    cursor = {"segments": {}, "sealed": "", "legacy": "", "sessions": {}, "latest": None}
+    try:
+        with open(CURSOR_FILE, "r") as f:
+            cursor.update(json.load(f))
+    except Exception:
+        pass
+    return cursor
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _apply(cursor, record):
+    step = EVENT_STEPS.get(record.get("event_type"))
+    if step is None:
+        return
+
+    metadata = record.get("metadata")
+    sid = metadata.get("session_id") if isinstance(metadata, dict) else None
+    sid = str(sid) if sid is not None else "unknown"
+
+    sessions = cursor["sessions"]
+    session = sessions.pop(sid, None) or {"completed_steps": []}
+    reached = max([step] + session["completed_steps"])
+    session["completed_steps"] = list(range(1, reached + 1))
+    session["last_updated"] = record.get("timestamp")
+    sessions[sid] = session  # re-insert: most recent last
+    cursor["latest"] = sid
+
+    while len(sessions) > MAX_SESSIONS:
+        sessions.pop(next(iter(sessions)))
+
+
+def _read_segment(cursor, path):
     """
-    Reads audit transcripts and determines
-    which KEMTLS handshake steps have occurred.
+    Applies the complete lines appended to `path` since the last run.
+    Returns True if the segment was read to its end.
     """
-    state = {
-        "completed_steps": [],
-        "last_updated": None
+    name = os.path.basename(path)
+    offset = cursor["segments"].get(name, 0)
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+
+    # A partial last line is still being written: leave it for next time
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        try:
+            _apply(cursor, json.loads(line))
+        except Exception:
+            continue
+
+    cursor["segments"][name] = offset + end
+    return end == len(data)
+
+
+def _sync_segments(cursor):
+    now = time.time()
+    sealing = True
+    for path in list_segments(AUDIT_DIR):
+        name = os.path.basename(path)
+        if name <= cursor["sealed"]:
+            continue
+        try:
+            at_end = _read_segment(cursor, path)
+            idle = now - os.path.getmtime(path)
+        except Exception:
+            continue
+
+        # Advance the watermark over a prefix of finished segments only
+        sealing = sealing and at_end and idle > SEAL_AFTER
+        if sealing:
+            cursor["sealed"] = name
+            cursor["segments"].pop(name, None)
+
+    # Forget offsets of segments that were deleted or archived
+    cursor["segments"] = {
+        name: off for name, off in cursor["segments"].items()
+        if os.path.exists(os.path.join(AUDIT_DIR, name))
     }
 
+
+def _sync_legacy(cursor):
+    # One JSON file per event, from before segmented audit logs
     try:
-        files = sorted(os.listdir(AUDIT_DIR))
+        files = sorted(
+            f for f in os.listdir(AUDIT_DIR)
+            if f.endswith(".json") and f > cursor["legacy"]
+        )
     except Exception:
         files = []
 
     for filename in files:
-        if not filename.endswith(".json"):
-            continue
-
         try:
             with open(os.path.join(AUDIT_DIR, filename), "r") as f:
-                record = json.load(f)
+                _apply(cursor, json.load(f))
+        except Exception:
+            pass
+        cursor["legacy"] = filename
 
-            if record.get("event_type") == "kem_handshake":
-                state["completed_steps"] = [1, 2, 3, 4]
-                state["last_updated"] = record.get("timestamp")
 
-        except Exception:
-            continue
+def generate_handshake_state():
+    """
+    Reads audit transcripts written since the last run and updates
+    which KEMTLS handshake steps each session has reached.
+    """
+    cursor = _load_cursor()
+    _sync_legacy(cursor)
+    _sync_segments(cursor)
+
+    sessions = cursor["sessions"]
+    latest = sessions.get(cursor["latest"]) or {}
+
+    # Top-level fields describe the latest session (handshake.html)
+    state = {
+        "completed_steps": latest.get("completed_steps", []),
+        "last_updated": latest.get("last_updated"),
+        "latest_session": cursor["latest"],
+        "sessions": sessions,
+    }
 
     try:
-        with open(OUTPUT_FILE, "w") as f:
-            json.dump(state, f, indent=2)
+        _write_json(CURSOR_FILE, cursor)
+        _write_json(OUTPUT_FILE, state)
     except Exception:
         pass
 
+    return state
+
 
 if __name__ == "__main__":
     generate_handshake_state()
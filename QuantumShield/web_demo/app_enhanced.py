@@ -334,6 +334,24 @@ def get_system_metrics():
         'uptime': uptime
     })
 
+@app.route("/api/loadtest", methods=["GET"])
+def get_loadtest():
+    """Get the last load test summary written by metrics/loadtest.py"""
+    report_file = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics", "report.json"
+    )
+    try:
+        with open(report_file) as f:
+            loadtest = json.load(f).get("loadtest")
+    except Exception:
+        loadtest = None
+
+    if not loadtest:
+        return jsonify({'error': 'No load test results'}), 404
+
+    # Histograms are for merging/offline analysis; the dashboard needs the summary
+    return jsonify({k: v for k, v in loadtest.items() if k != 'histograms'})
+
 @app.route("/api/sessions", methods=["GET"])
 def get_sessions():
     """Get active KEMTLS sessions"""